@@ -0,0 +1,124 @@
+"""
+Deterministic model backend used by the offline benchmarks
+Implements the ModelBackend interface with configurable latency distributions and
+transient error rates, without any network access
+"""
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from src.services.model_backend import ModelBackend, ModelResponse, UsageMetadata
+from src.utils.tokens import estimate_tokens
+
+LATENCY_DISTRIBUTIONS = ('constant', 'uniform', 'exponential', 'lognormal')
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_STORY_RE = re.compile(r'story-\d+')
+_DOCUMENT_RE = re.compile(r'<<<DOCUMENT (\d+)>>>\n(.*?)\n<<<END DOCUMENT \1>>>', re.DOTALL)
+
+
+class FakeTransientError(ConnectionError):
+    """Raised for simulated transient failures; retryable under the default RetryPolicy"""
+
+
+class FakeModel(ModelBackend):
+    """
+    Answers every prompt kind GeminiService sends, deterministically
+
+    Latency and failures are drawn from a generator seeded by the prompt and its attempt
+    number, so a run is reproducible regardless of thread scheduling and a retried prompt
+    can succeed. Similarity prompts are answered DUPLICATE when both articles carry the
+    same story-N marker.
+    """
+
+    def __init__(self, latency_ms: float = 20.0, distribution: str = 'lognormal', sigma: float = 0.5,
+                 error_rate: float = 0.0, seed: int = 0, sleep: bool = True):
+        """
+        Args:
+            latency_ms: Mean latency (median for lognormal) in milliseconds (default: 20)
+            distribution: One of constant, uniform (0..2x mean), exponential, lognormal (default)
+            sigma: Shape of the lognormal distribution; higher means a heavier tail (default: 0.5)
+            error_rate: Probability that an attempt raises FakeTransientError (default: 0.0)
+            seed: Seed mixed into every draw (default: 0)
+            sleep: Actually wait for the drawn latency (default: True)
+        """
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"distribution must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        self.latency = latency_ms / 1000.0
+        self.distribution = distribution
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.seed = seed
+        self.sleep = sleep
+        self.model_name = 'fake-model'
+        self.calls = 0
+        self.errors = 0
+        self._attempts: Dict[bytes, int] = {}
+        self._lock = threading.Lock()
+
+    def _draw(self, prompt: str):
+        digest = hashlib.blake2b(prompt.encode('utf-8'), digest_size=8).digest()
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+            self.calls += 1
+        rng = random.Random(f"{self.seed}:{digest.hex()}:{attempt}")
+        if self.distribution == 'constant':
+            delay = self.latency
+        elif self.distribution == 'uniform':
+            delay = rng.uniform(0.0, 2.0 * self.latency)
+        elif self.distribution == 'exponential':
+            delay = rng.expovariate(1.0 / self.latency) if self.latency > 0 else 0.0
+        else:
+            delay = self.latency * rng.lognormvariate(0.0, self.sigma)
+        failed = rng.random() < self.error_rate
+        if failed:
+            with self._lock:
+                self.errors += 1
+        return delay, failed
+
+    def _answer(self, prompt: str) -> str:
+        if 'Return ONLY "DUPLICATE"' in prompt:
+            return 'DUPLICATE' if len(set(_STORY_RE.findall(prompt))) == 1 else 'DIFFERENT'
+        if '<<<DOCUMENT' in prompt:
+            return json.dumps([
+                {'id': int(index), 'content': _TAG_RE.sub(' ', body).strip() or None}
+                for index, body in _DOCUMENT_RE.findall(prompt)
+            ])
+        body = prompt.rsplit('\n\n', 1)[-1]
+        if 'return it in JSON format' in prompt:
+            text = _TAG_RE.sub(' ', body).strip()
+            return json.dumps({'title': text[:60], 'date': None, 'content': text, 'summary': text[:120]})
+        return ' '.join(_TAG_RE.sub(' ', body).split())
+
+    def _response(self, prompt: str) -> ModelResponse:
+        text = self._answer(prompt)
+        return ModelResponse(text, UsageMetadata(estimate_tokens(prompt), estimate_tokens(text)))
+
+    def generate(self, prompt: str, generation_config: Optional[dict] = None) -> ModelResponse:
+        delay, failed = self._draw(prompt)
+        if self.sleep and delay > 0:
+            time.sleep(delay)
+        if failed:
+            raise FakeTransientError("503 Service Unavailable (simulated)")
+        return self._response(prompt)
+
+    async def agenerate(self, prompt: str, generation_config: Optional[dict] = None) -> ModelResponse:
+        delay, failed = self._draw(prompt)
+        if self.sleep and delay > 0:
+            await asyncio.sleep(delay)
+        if failed:
+            raise FakeTransientError("503 Service Unavailable (simulated)")
+        return self._response(prompt)
+
+    def embed(self, texts: List[str], model: str, task_type: str) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            rng = random.Random(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest())
+            vectors.append([rng.gauss(0.0, 1.0) for _ in range(64)])
+        return vectors
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Import-time regression benchmark for Destiny
+Measures the cold import of src.content_processor and `--help` of the CLI in fresh
+interpreters, lists the slowest modules from `python -X importtime`, and fails if heavy
+optional dependencies (Gemini SDK, grpc, protobuf, numpy, psycopg2) are loaded by the
+import or by creating a ContentProcessor.
+
+Usage:
+    python benchmarks/import_time.py --runs 10 --max-import-ms 150
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported when a model call, vector search or PostgreSQL I/O needs them
+LAZY_MODULES = ('google.generativeai', 'grpc', 'google.protobuf', 'numpy', 'psycopg2', 'hnswlib')
+
+_PROBE = """
+import sys, json, time
+started = time.perf_counter()
+import src.content_processor as content_processor
+imported = time.perf_counter() - started
+content_processor.ContentProcessor(gemini_api_key='unused')
+print(json.dumps({'seconds': imported, 'loaded': [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def _python(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def probe_import() -> Dict[str, Any]:
+    """Import the package in a fresh interpreter; returns seconds and lazily-expected modules that got loaded"""
+    return json.loads(_python(['-c', _PROBE]).stdout)
+
+
+def time_help() -> float:
+    """Wall time in seconds of `python -m src.content_processor --help`"""
+    started = time.perf_counter()
+    _python(['-m', 'src.content_processor', '--help'])
+    return time.perf_counter() - started
+
+
+def slowest_modules(limit: int = 15) -> List[Tuple[str, int, int]]:
+    """
+    Parse `python -X importtime` for the package import
+
+    Returns:
+        (module, self microseconds, cumulative microseconds) sorted by self time, descending
+    """
+    stderr = _python(['-X', 'importtime', '-c', 'import src.content_processor']).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows[:limit]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Cold import time of the Destiny package')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per measurement (default: 5)')
+    parser.add_argument('--max-import-ms', type=float,
+                        help='Fail if the median import of src.content_processor exceeds this')
+    parser.add_argument('--top', type=int, default=15, help='Slowest modules to list (default: 15)')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    probes = [probe_import() for _ in range(args.runs)]
+    import_ms = statistics.median(probe['seconds'] for probe in probes) * 1000
+    help_ms = statistics.median(time_help() for _ in range(args.runs)) * 1000
+    loaded = sorted({module for probe in probes for module in probe['loaded']})
+    slowest = slowest_modules(args.top)
+
+    print(f"import src.content_processor: {import_ms:8.1f} ms (median of {args.runs})")
+    print(f"content_processor --help:     {help_ms:8.1f} ms (median of {args.runs}, includes interpreter start)")
+    print(f"\n{'module':<48} {'self ms':>9} {'cumulative ms':>14}")
+    for name, self_us, cumulative_us in slowest:
+        print(f"{name:<48} {self_us / 1000:>9.2f} {cumulative_us / 1000:>14.2f}")
+
+    failures = []
+    if loaded:
+        failures.append(f"heavy modules loaded at import: {', '.join(loaded)}")
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"import took {import_ms:.1f} ms, budget is {args.max_import_ms:.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump({'import_ms': import_ms, 'help_ms': help_ms, 'loaded': loaded,
+                       'slowest': [{'module': n, 'self_us': s, 'cumulative_us': c} for n, s, c in slowest],
+                       'failures': failures}, output, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Local mock model server for load tests
+Serves the benchmark fake model over HTTP/1.1 keep-alive with OpenAI-compatible
+(/v1/chat/completions, /v1/embeddings) and Gemini-compatible (:generateContent,
+:countTokens, :batchEmbedContents) routes, for use with HTTPBackend
+
+Usage:
+    python benchmarks/mock_server.py --port 8080 --latency-ms 50 --error-rate 0.01
+"""
+import os
+import sys
+import json
+import socket
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the parent directory to the path so we can import from src and benchmarks
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_model import FakeModel, FakeTransientError
+from src.utils.tokens import estimate_tokens
+
+
+def make_handler(model: FakeModel):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            # Headers and body are written separately; without this Nagle adds ~40ms per response
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload: dict, headers: dict = None) -> None:
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                request = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                self._send(400, {'error': 'invalid JSON'})
+                return
+            try:
+                if self.path.endswith('/chat/completions'):
+                    prompt = ''.join(message.get('content', '') for message in request.get('messages', []))
+                    response = model.generate(prompt)
+                    self._send(200, {
+                        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': response.text}}],
+                        'usage': {'prompt_tokens': response.usage_metadata.prompt_token_count,
+                                  'completion_tokens': response.usage_metadata.candidates_token_count},
+                    })
+                elif self.path.endswith(':generateContent'):
+                    prompt = ''.join(part.get('text', '') for content in request.get('contents', [])
+                                     for part in content.get('parts', []))
+                    response = model.generate(prompt)
+                    self._send(200, {
+                        'candidates': [{'content': {'role': 'model', 'parts': [{'text': response.text}]}}],
+                        'usageMetadata': {'promptTokenCount': response.usage_metadata.prompt_token_count,
+                                          'candidatesTokenCount': response.usage_metadata.candidates_token_count},
+                    })
+                elif self.path.endswith(':countTokens'):
+                    text = ''.join(part.get('text', '') for content in request.get('contents', [])
+                                   for part in content.get('parts', []))
+                    self._send(200, {'totalTokens': estimate_tokens(text)})
+                elif self.path.endswith('/embeddings'):
+                    texts = request.get('input') or []
+                    texts = [texts] if isinstance(texts, str) else texts
+                    vectors = model.embed(texts, request.get('model', ''), '')
+                    self._send(200, {'data': [{'index': i, 'embedding': v} for i, v in enumerate(vectors)]})
+                elif self.path.endswith(':batchEmbedContents'):
+                    texts = [''.join(part.get('text', '') for part in entry.get('content', {}).get('parts', []))
+                             for entry in request.get('requests', [])]
+                    self._send(200, {'embeddings': [{'values': v} for v in model.embed(texts, '', '')]})
+                else:
+                    self._send(404, {'error': f"unknown route {self.path}"})
+            except FakeTransientError as e:
+                self._send(503, {'error': str(e)}, {'Retry-After': '0'})
+
+    return Handler
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Mock OpenAI-/Gemini-compatible model server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--distribution', default='lognormal',
+                        choices=('constant', 'uniform', 'exponential', 'lognormal'))
+    parser.add_argument('--sigma', type=float, default=0.5)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    model = FakeModel(latency_ms=args.latency_ms, distribution=args.distribution, sigma=args.sigma,
+                      error_rate=args.error_rate, seed=args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(model))
+    server.daemon_threads = True
+    print(f"Mock model server listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
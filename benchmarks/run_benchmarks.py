@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for Destiny
+Runs process_batch, the HTML path and find_duplicates against a deterministic fake model
+(see fake_model.py) and reports throughput, p50/p99 latency per unit of work and peak RSS.
+Every scenario and size runs in a fresh process so peak RSS is measured in isolation.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 --latency-ms 20 --error-rate 0.01
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List
+
+# Add the parent directory to the path so we can import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCENARIOS = ('batch', 'html', 'html_packed', 'dedup')
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+_WORDS = [f"w{i}" for i in range(5000)]
+
+
+def make_text_items(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Short translated-text items for clean_translation"""
+    return [{'id': f"item-{i}", 'content': ' '.join(rng.choices(_WORDS, k=120))} for i in range(count)]
+
+
+def make_html_items(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """News-like HTML pages with navigation, article body and footer boilerplate"""
+    items = []
+    for i in range(count):
+        paragraphs = ''.join(f"<p>{' '.join(rng.choices(_WORDS, k=60))}.</p>" for _ in range(5))
+        html = (
+            "<html><head><title>News</title><script>var tracking = 1;</script></head><body>"
+            "<nav class='menu'><a href='/'>Home</a> <a href='/world'>World</a> <a href='/sport'>Sport</a></nav>"
+            f"<article><h1>Headline {i}</h1>{paragraphs}</article>"
+            "<footer class='footer'>Copyright. <a href='/privacy'>Privacy</a></footer></body></html>"
+        )
+        items.append({'id': f"item-{i}", 'content': html})
+    return items
+
+
+def make_dedup_items(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Items grouped into stories; variants of a story share most words and a story-N marker"""
+    items = []
+    story = 0
+    while len(items) < count:
+        base = rng.choices(_WORDS, k=80)
+        for _ in range(min(rng.choice((1, 1, 2, 3)), count - len(items))):
+            words = [rng.choice(_WORDS) if rng.random() < 0.05 else word for word in base]
+            items.append({'id': f"item-{len(items)}", 'title': f"Story {story}",
+                          'content': f"story-{story} " + ' '.join(words)})
+        story += 1
+    return items
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _timed(func: Callable, latencies: List[float]) -> Callable:
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+    return wrapper
+
+
+def run_scenario(scenario: str, size: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one scenario at one size in the current process
+
+    Returns:
+        Result row: throughput, latency percentiles (ms), RSS (MB) and fake model counters
+    """
+    from benchmarks.fake_model import FakeModel
+    from src.content_processor import ContentProcessor
+    from src.services.gemini_service import GeminiService
+    from src.services.model_backend import HTTPBackend
+    from src.utils.retry import RetryPolicy
+
+    # Per-item INFO logs and simulated-retry warnings would dominate the output
+    logging.getLogger().setLevel(logging.ERROR)
+    rng = random.Random(options['seed'])
+    model = FakeModel(latency_ms=options['latency_ms'], distribution=options['distribution'],
+                      sigma=options['sigma'], error_rate=options['error_rate'], seed=options['seed'],
+                      sleep=not options['no_sleep'])
+    backend = model
+    if options['backend_url']:
+        # Latency and errors then come from the server (e.g. benchmarks/mock_server.py)
+        backend = HTTPBackend(options['backend_url'], 'fake-model', api_style=options['api_style'],
+                              pool_size=options['threads'])
+    service = GeminiService(backend=backend, pre_extract_html=scenario == 'html',
+                            retry_policy=RetryPolicy(max_attempts=5, base_delay=0.01, max_delay=0.1))
+    processor = ContentProcessor(gemini_service=service)
+    latencies: List[float] = []
+
+    if scenario == 'batch':
+        items = make_text_items(size, rng)
+        rss_before = _peak_rss_mb()
+        started = time.perf_counter()
+        stats = processor.process_batch(items, process_func=_timed(processor.clean_translation, latencies),
+                                        max_workers=options['threads'])
+    elif scenario == 'html':
+        items = make_html_items(size, rng)
+        rss_before = _peak_rss_mb()
+        started = time.perf_counter()
+        process_func = _timed(lambda html: processor.process_html_content(html), latencies)
+        stats = processor.process_batch(items, process_func=process_func, max_workers=options['threads'])
+    elif scenario == 'html_packed':
+        items = make_html_items(size, rng)
+        rss_before = _peak_rss_mb()
+        started = time.perf_counter()
+        pack = _timed(processor.process_html_batch, latencies)
+        results: List[Any] = []
+        for start in range(0, len(items), options['pack_size']):
+            results.extend(pack([item['content'] for item in items[start:start + options['pack_size']]]))
+        stats = {'processed': sum(1 for result in results if result), 'total': len(items)}
+    elif scenario == 'dedup':
+        items = make_dedup_items(size, rng)
+        rss_before = _peak_rss_mb()
+        started = time.perf_counter()
+        processor.detect_content_similarity = _timed(processor.detect_content_similarity, latencies)
+        duplicates = processor.find_duplicates(items, candidate_threshold=options['candidate_threshold'],
+                                               stream=True)
+        stats = {'duplicates': sum(1 for _ in duplicates), 'total': len(items)}
+    else:
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+    elapsed = time.perf_counter() - started
+    backend.close()
+    ordered = sorted(latencies)
+    return {
+        'scenario': scenario,
+        'items': size,
+        'seconds': round(elapsed, 3),
+        'items_per_second': round(size / elapsed, 1) if elapsed > 0 else 0.0,
+        'latency_unit': {'html_packed': 'pack', 'dedup': 'comparison'}.get(scenario, 'item'),
+        'p50_ms': round(_percentile(ordered, 0.50) * 1000, 2),
+        'p99_ms': round(_percentile(ordered, 0.99) * 1000, 2),
+        'rss_before_mb': round(rss_before, 1),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'model_calls': model.calls if backend is model else '-',
+        'model_errors': model.errors if backend is model else '-',
+        'stats': stats,
+    }
+
+
+def _print_row(row: Dict[str, Any]) -> None:
+    print(f"{row['scenario']:<12} {row['items']:>8} {row['seconds']:>9.2f} {row['items_per_second']:>10.1f} "
+          f"{row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['latency_unit']:<10} "
+          f"{row['peak_rss_mb']:>8.1f} {row['model_calls']:>8} {row['model_errors']:>7}", flush=True)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Offline Destiny benchmarks with a fake model')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Mean fake model latency (default: 20)')
+    parser.add_argument('--distribution', default='lognormal',
+                        choices=('constant', 'uniform', 'exponential', 'lognormal'))
+    parser.add_argument('--sigma', type=float, default=0.5, help='Lognormal shape (default: 0.5)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Transient failure probability per attempt')
+    parser.add_argument('--threads', type=int, default=32, help='max_workers for process_batch (default: 32)')
+    parser.add_argument('--pack-size', type=int, default=200,
+                        help='Documents per process_html_batch call; html_packed latency is per call')
+    parser.add_argument('--candidate-threshold', type=float, default=0.5, help='LSH threshold for dedup')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-sleep', action='store_true', help='Skip fake latency to measure pure overhead')
+    parser.add_argument('--backend-url', help='Send model calls to this HTTP endpoint instead of the in-process fake')
+    parser.add_argument('--api-style', default='openai', choices=('openai', 'gemini'),
+                        help='Wire format of --backend-url (default: openai)')
+    parser.add_argument('--json', help='Also write the result rows to this JSON file')
+    args = parser.parse_args(argv)
+    options = vars(args)
+
+    print(f"{'scenario':<12} {'items':>8} {'seconds':>9} {'items/s':>10} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'per':<10} {'rss MB':>8} {'calls':>8} {'errors':>7}")
+    rows = []
+    context = multiprocessing.get_context('spawn')
+    for scenario in args.scenarios:
+        for size in args.sizes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                row = executor.submit(run_scenario, scenario, size, options).result()
+            _print_row(row)
+            rows.append(row)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump({'options': options, 'results': rows}, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
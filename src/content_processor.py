@@ -5,42 +5,98 @@ Processes content from various sources using Gemini AI for extraction and transl
 """
 import os
 import sys
+import json
+import asyncio
+import inspect
 import logging
-from typing import Optional, Dict, List, Any, Callable
-from .services.gemini_service import GeminiService
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional, Dict, List, Any, Callable, Deque, Iterable, Iterator, Tuple, Union
+from .services.gemini_service import ArticleContent, GeminiService
+from .utils.cache import ResponseCache
+from .utils.checkpoint import CheckpointStore, content_hash
+from .utils.dedup_cascade import (DuplicateCascade, EmbeddingStage, ExactHashStage, JaccardStage,
+                                  ModelStage, SimHashStage)
+from .utils.dedup_options import DuplicateOptions
+from .utils.metrics import MetricsRecorder
+from .utils.minhash import LSHIndex, MinHasher, estimate_jaccard
+from .utils.pair_tracking import PairTracker
+from .utils.rate_limiter import RateLimiter
+from .utils.retry import RetryPolicy
+from .utils.union_find import UnionFind
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Message recorded for items whose processing returned no content
+NO_VALID_CONTENT = "No valid content found during processing"
+
 class ContentProcessor:
-    def __init__(self, gemini_api_key: Optional[str] = None, model_name: str = 'gemini-1.5-flash'):
+    def __init__(self, gemini_api_key: Optional[str] = None, model_name: str = 'gemini-1.5-flash',
+                 cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 pre_extract_html: bool = False,
+                 gemini_service: Optional[GeminiService] = None,
+                 metrics: Optional[MetricsRecorder] = None):
         """
         Initialize the content processor with Gemini AI
         
         Args:
             gemini_api_key: Google Gemini API key. If None, reads from GEMINI_API_KEY env var
             model_name: Gemini model to use (default: gemini-1.5-flash)
+            cache: Optional response cache passed through to GeminiService
+            rate_limiter: Optional rate limiter passed through to GeminiService
+            retry_policy: Optional retry policy passed through to GeminiService
+            pre_extract_html: Strip HTML boilerplate locally before prompting (default: False)
+            gemini_service: Preconfigured GeminiService to use (e.g. with token budget or chunking
+                options). When given, all other arguments are ignored
+            metrics: Optional MetricsRecorder passed through to GeminiService
         """
-        self.gemini_service = GeminiService(api_key=gemini_api_key, model_name=model_name)
+        if gemini_service is not None:
+            self.gemini_service = gemini_service
+            return
+        self.gemini_service = GeminiService(api_key=gemini_api_key, model_name=model_name,
+                                            cache=cache, rate_limiter=rate_limiter,
+                                            retry_policy=retry_policy,
+                                            pre_extract_html=pre_extract_html,
+                                            metrics=metrics)
     
-    def process_html_content(self, html_content: str, target_language: str = "English") -> Optional[str]:
+    def process_html_content(self, html_content: str, target_language: str = "English",
+                             translate: bool = True) -> Optional[str]:
         """
         Process raw HTML content by extracting main article text and translating
         
         Args:
             html_content: Raw HTML content to process
             target_language: Target language for translation (default: English)
+            translate: If False, the main text is extracted locally and the model is not called
             
         Returns:
             Processed and translated content or None if processing fails
         """
         try:
-            return self.gemini_service.process_html_content(html_content, target_language)
+            return self.gemini_service.process_html_content(html_content, target_language, translate)
         except Exception as e:
             logger.error(f"HTML processing error: {str(e)}")
             raise Exception(f"Failed to process HTML content: {str(e)}")
     
+    def process_html_batch(self, html_list: List[str], target_language: str = "English") -> List[Optional[str]]:
+        """
+        Process several HTML documents, packing them into as few model requests as possible
+        
+        Args:
+            html_list: Raw HTML documents to process
+            target_language: Target language for translation (default: English)
+            
+        Returns:
+            List aligned with html_list holding processed content, or None where no content was found
+        """
+        try:
+            return self.gemini_service.process_html_batch(html_list, target_language)
+        except Exception as e:
+            logger.error(f"HTML batch processing error: {str(e)}")
+            raise Exception(f"Failed to process HTML batch: {str(e)}")
+    
     def clean_translation(self, text: str) -> Optional[str]:
         """
         Clean translation text by removing unwanted content and metadata
@@ -57,7 +113,7 @@ class ContentProcessor:
             logger.error(f"Translation cleaning error: {str(e)}")
             raise Exception(f"Failed to clean translation: {str(e)}")
     
-    def extract_article_content(self, text: str) -> Optional[dict]:
+    def extract_article_content(self, text: str) -> Optional[ArticleContent]:
         """
         Extract and structure article content from messy text
         
@@ -65,7 +121,8 @@ class ContentProcessor:
             text: Raw text to extract article content from
             
         Returns:
-            Dictionary with structured content or None if extraction fails
+            ArticleContent dictionary (title, date, content, summary) or None if no
+            article content was found
         """
         try:
             return self.gemini_service.extract_article_content(text)
@@ -97,7 +154,9 @@ class ContentProcessor:
                      content_field: str = 'content',
                      id_field: str = 'id',
                      process_func: Optional[Callable] = None,
-                     update_callback: Optional[Callable] = None) -> Dict[str, int]:
+                     update_callback: Optional[Callable] = None,
+                     max_workers: int = 1,
+                     checkpoint: Optional[CheckpointStore] = None) -> Dict[str, int]:
         """
         Process a batch of content items with customizable processing and update functions
         
@@ -107,145 +166,738 @@ class ContentProcessor:
             id_field: Field name containing unique identifier (default: 'id')
             process_func: Custom processing function. If None, uses process_html_content
             update_callback: Function to call with (id, processed_content, is_error) for each item
+            max_workers: Number of items processed concurrently (default: 1, sequential).
+                When greater than 1, process_func and update_callback are called from
+                worker threads and must be thread-safe
+            checkpoint: Optional checkpoint store. Items finished in an earlier run with the
+                same content are skipped and counted under 'resumed'
             
         Returns:
             Dictionary with processing statistics
         """
-        if not process_func:
-            process_func = self.process_html_content
-        
-        logger.info(f"Starting batch processing of {len(items)} items...")
-        
-        processed = 0
-        failed = 0
-        skipped = 0
+        logger.info(f"Starting batch processing of {len(items)} items with {max_workers} worker(s)...")
         
-        for item in items:
-            try:
-                item_id = item.get(id_field)
-                content = item.get(content_field)
-                
-                if not content:
-                    logger.warning(f"No content found for item {item_id}")
-                    skipped += 1
-                    continue
-                
-                logger.info(f"Processing item {item_id}...")
-                
-                # Process content using provided function
-                result = process_func(content)
-                
-                if result:
-                    # Update using callback if provided
-                    if update_callback:
-                        if update_callback(item_id, result, False):
-                            logger.info(f"Successfully processed item {item_id}")
-                            processed += 1
-                        else:
-                            logger.warning(f"Failed to update item {item_id}")
-                            failed += 1
-                    else:
-                        logger.info(f"Successfully processed item {item_id} (no update callback)")
-                        processed += 1
-                else:
-                    # Handle "no valid content" case
-                    error_msg = "No valid content found during processing"
-                    if update_callback:
-                        if update_callback(item_id, error_msg, True):
-                            logger.warning(f"No valid content for item {item_id} - recorded as error")
-                            skipped += 1
-                        else:
-                            logger.error(f"Failed to record error for item {item_id}")
-                            failed += 1
-                    else:
-                        logger.warning(f"No valid content for item {item_id}")
-                        skipped += 1
-                    
-            except Exception as e:
-                # Handle processing errors
-                error_msg = f"Processing failed: {str(e)}"
-                item_id = item.get(id_field, 'unknown')
-                
-                if update_callback:
-                    try:
-                        if update_callback(item_id, error_msg, True):
-                            logger.error(f"Processing error for item {item_id}: {str(e)} - recorded")
-                            failed += 1
-                        else:
-                            logger.error(f"Failed to record processing error for item {item_id}: {str(e)}")
-                            failed += 1
-                    except Exception as cb_error:
-                        logger.error(f"Callback error while recording processing error for item {item_id}: {str(cb_error)}")
-                        failed += 1
-                else:
-                    logger.error(f"Processing error for item {item_id}: {str(e)}")
-                    failed += 1
+        # Outcomes are tallied on the calling thread, so workers never share counters
+        stats = {'processed': 0, 'failed': 0, 'skipped': 0, 'resumed': 0}
+        for record in self.process_stream(items, content_field, id_field, process_func,
+                                          update_callback, max_workers, checkpoint=checkpoint):
+            stats[record['status']] += 1
         
         results = {
-            'processed': processed,
-            'failed': failed,
-            'skipped': skipped,
+            'processed': stats['processed'],
+            'failed': stats['failed'],
+            'skipped': stats['skipped'],
             'total': len(items)
         }
+        if checkpoint is not None:
+            results['resumed'] = stats['resumed']
         
         logger.info(f"Batch processing completed: {results}")
         return results
     
-    def find_duplicates(self, items: List[Dict[str, Any]], 
+    def process_stream(self,
+                       items: Iterable[Dict[str, Any]],
                        content_field: str = 'content',
-                       title_field: str = 'title',
-                       id_field: str = 'id') -> List[Dict[str, Any]]:
+                       id_field: str = 'id',
+                       process_func: Optional[Callable] = None,
+                       update_callback: Optional[Callable] = None,
+                       max_workers: int = 1,
+                       max_in_flight: Optional[int] = None,
+                       checkpoint: Optional[CheckpointStore] = None) -> Iterator[Dict[str, Any]]:
         """
-        Find duplicate content items in a list using AI similarity detection
+        Process items from any iterable, yielding a record per item as it completes
+        
+        Items are pulled from the iterable lazily and at most max_in_flight of them are held
+        at once, so input can come from a generator, DB cursor or file with constant memory.
         
         Args:
-            items: List of items to check for duplicates
-            content_field: Field name containing content (default: 'content')
-            title_field: Field name containing title (default: 'title')
+            items: Iterable of content items to process
+            content_field: Field name containing content to process (default: 'content')
             id_field: Field name containing unique identifier (default: 'id')
+            process_func: Custom processing function. If None, uses process_html_content
+            update_callback: Function to call with (id, processed_content, is_error) for each item
+            max_workers: Number of items processed concurrently (default: 1, sequential)
+            max_in_flight: Maximum items submitted but not yet yielded (default: 2 * max_workers)
+            checkpoint: Optional checkpoint store keyed by id_field and content hash. Finished
+                items are skipped without processing and every outcome is recorded
             
-        Returns:
-            List of duplicate pairs with similarity information
+        Yields:
+            Dictionaries with 'id', 'status' ('processed', 'failed', 'skipped', or 'resumed' for
+            items finished in an earlier run) and 'result' (processed content, error message,
+            or None). With several workers, records come in completion order
         """
-        duplicates = []
-        processed_pairs = set()
+        if not process_func:
+            process_func = self.process_html_content
         
-        logger.info(f"Checking {len(items)} items for duplicates...")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
         
-        for i, item1 in enumerate(items):
-            for j, item2 in enumerate(items[i+1:], i+1):
-                # Create unique pair identifier
-                pair_id = tuple(sorted([item1.get(id_field), item2.get(id_field)]))
-                if pair_id in processed_pairs:
+        if max_in_flight is None:
+            max_in_flight = 2 * max_workers
+        max_in_flight = max(max_in_flight, max_workers)
+        
+        def run(item: Dict[str, Any]) -> Dict[str, Any]:
+            return self._process_item(item, content_field, id_field, process_func, update_callback)
+        
+        def pending() -> Iterator[Tuple[Dict[str, Any], Optional[str]]]:
+            # Yields (item, content hash) for items that still need processing; resumed
+            # items are reported through the resumed queue instead
+            for item in items:
+                if checkpoint is None:
+                    yield item, None
                     continue
-                processed_pairs.add(pair_id)
+                digest = content_hash(item.get(content_field))
+                if checkpoint.should_skip(item.get(id_field), digest):
+                    resumed.append({'id': item.get(id_field), 'status': 'resumed', 'result': None})
+                    continue
+                yield item, digest
+        
+        def finish(record: Dict[str, Any], digest: Optional[str]) -> Dict[str, Any]:
+            # Runs on the calling thread, so the checkpoint store sees one writer
+            if checkpoint is not None:
+                checkpoint.record(record['id'], digest, record['status'])
+            return record
+        
+        # Resumed records are yielded first in, first out, so they keep their input order
+        resumed: Deque[Dict[str, Any]] = deque()
+        try:
+            if max_workers == 1:
+                for item, digest in pending():
+                    while resumed:
+                        yield resumed.popleft()
+                    yield finish(run(item), digest)
+                while resumed:
+                    yield resumed.popleft()
+                return
+            
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                in_flight = {}
+                for item, digest in pending():
+                    while resumed:
+                        yield resumed.popleft()
+                    in_flight[executor.submit(run, item)] = digest
+                    if len(in_flight) >= max_in_flight:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield finish(future.result(), in_flight.pop(future))
+                while resumed:
+                    yield resumed.popleft()
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield finish(future.result(), in_flight.pop(future))
+        finally:
+            if checkpoint is not None:
+                checkpoint.flush()
+    
+    def _process_item(self,
+                      item: Dict[str, Any],
+                      content_field: str,
+                      id_field: str,
+                      process_func: Callable,
+                      update_callback: Optional[Callable]) -> Dict[str, Any]:
+        """
+        Process a single batch item and report it through the update callback
+        
+        Returns:
+            Dictionary with the item 'id', its 'status' ('processed', 'failed' or 'skipped')
+            and 'result' (processed content, error message, or None)
+        """
+        item_id = item.get(id_field)
+        try:
+            content = item.get(content_field)
+            
+            if not content:
+                logger.warning(f"No content found for item {item_id}")
+                return {'id': item_id, 'status': 'skipped', 'result': None}
+            
+            logger.info(f"Processing item {item_id}...")
+            
+            # Process content using provided function
+            result = process_func(content)
+            
+            recorded = None
+            if update_callback:
+                recorded = bool(update_callback(item_id, *self._callback_args(result)))
+            return self._outcome_record(item_id, result, recorded)
                 
+        except Exception as e:
+            # Handle processing errors
+            item_id = item.get(id_field, 'unknown')
+            recorded, callback_error = None, None
+            if update_callback:
                 try:
-                    is_duplicate = self.detect_content_similarity(
-                        item1.get(content_field, ''),
-                        item2.get(content_field, ''),
-                        item1.get(title_field, ''),
-                        item2.get(title_field, '')
-                    )
-                    
-                    if is_duplicate is True:
-                        duplicates.append({
-                            'item1': item1,
-                            'item2': item2,
-                            'similarity': 'duplicate'
-                        })
-                        logger.info(f"Found duplicate: {item1.get(id_field)} and {item2.get(id_field)}")
-                    
-                except Exception as e:
-                    logger.error(f"Error comparing items {item1.get(id_field)} and {item2.get(id_field)}: {str(e)}")
-                    continue
+                    recorded = bool(update_callback(item_id, f"Processing failed: {str(e)}", True))
+                except Exception as cb_error:
+                    callback_error = cb_error
+            return self._failure_record(item_id, e, recorded, callback_error)
+    
+    @staticmethod
+    def _callback_args(result: Any) -> Tuple[Any, bool]:
+        """(content, is_error) passed to the update callback for a process_func result"""
+        if result:
+            return result, False
+        return NO_VALID_CONTENT, True
+    
+    @staticmethod
+    def _outcome_record(item_id: Any, result: Any, recorded: Optional[bool]) -> Dict[str, Any]:
+        """
+        Build the record of an item whose process_func returned
+        
+        Args:
+            item_id: Identifier of the item
+            result: Value returned by process_func
+            recorded: What the update callback returned, or None without a callback
+            
+        Returns:
+            Dictionary with the item 'id', 'status' and 'result'
+        """
+        if result:
+            if recorded is None:
+                logger.info(f"Successfully processed item {item_id} (no update callback)")
+                return {'id': item_id, 'status': 'processed', 'result': result}
+            if recorded:
+                logger.info(f"Successfully processed item {item_id}")
+                return {'id': item_id, 'status': 'processed', 'result': result}
+            logger.warning(f"Failed to update item {item_id}")
+            return {'id': item_id, 'status': 'failed', 'result': result}
+        
+        # Handle "no valid content" case
+        if recorded is None:
+            logger.warning(f"No valid content for item {item_id}")
+            return {'id': item_id, 'status': 'skipped', 'result': NO_VALID_CONTENT}
+        if recorded:
+            logger.warning(f"No valid content for item {item_id} - recorded as error")
+            return {'id': item_id, 'status': 'skipped', 'result': NO_VALID_CONTENT}
+        logger.error(f"Failed to record error for item {item_id}")
+        return {'id': item_id, 'status': 'failed', 'result': NO_VALID_CONTENT}
+    
+    @staticmethod
+    def _failure_record(item_id: Any, error: Exception, recorded: Optional[bool],
+                        callback_error: Optional[Exception] = None) -> Dict[str, Any]:
+        """
+        Build the record of an item whose processing raised
+        
+        Args:
+            item_id: Identifier of the item
+            error: Exception raised while processing the item
+            recorded: What the update callback returned for the error, or None without a callback
+            callback_error: Exception raised by the update callback while recording the error
+            
+        Returns:
+            Dictionary with the item 'id', 'status' ('failed') and the error message as 'result'
+        """
+        if callback_error is not None:
+            logger.error(f"Callback error while recording processing error for item {item_id}: {str(callback_error)}")
+        elif recorded is None:
+            logger.error(f"Processing error for item {item_id}: {str(error)}")
+        elif recorded:
+            logger.error(f"Processing error for item {item_id}: {str(error)} - recorded")
+        else:
+            logger.error(f"Failed to record processing error for item {item_id}: {str(error)}")
+        return {'id': item_id, 'status': 'failed', 'result': f"Processing failed: {str(error)}"}
+    
+    def find_duplicates(self, items: List[Dict[str, Any]],
+                        content_field: Optional[str] = None,
+                        title_field: Optional[str] = None,
+                        id_field: Optional[str] = None,
+                        *,
+                        options: Optional[DuplicateOptions] = None,
+                        stream: bool = False,
+                        **overrides: Any) -> Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]:
+        """
+        Find duplicate content items in a list using AI similarity detection
+        
+        Args:
+            items: List of items to check for duplicates
+            content_field: Field name containing content (default: 'content', or that of options)
+            title_field: Field name containing title (default: 'title', or that of options)
+            id_field: Field name containing unique identifier (default: 'id', or that of options)
+            options: DuplicateOptions with the fields, candidate strategy, cascade and
+                blocking to use. If None, the defaults are used (all pairs, judged by the model)
+            stream: If True, return a generator yielding duplicates as they are found
+                instead of collecting them in a list (default: False)
+            **overrides: Individual DuplicateOptions fields, e.g. candidate_threshold=0.3,
+                applied on top of options
+            
+        Returns:
+            List (or generator, with stream=True) of duplicate pairs with similarity
+            information. Pairs found via embeddings also carry their cosine similarity
+            under 'score', pairs judged by a cascade the deciding stage under 'stage'
+        """
+        duplicates = self.iter_duplicates(items, content_field, title_field, id_field, options=options, **overrides)
+        return duplicates if stream else list(duplicates)
+    
+    def iter_duplicates(self, items: List[Dict[str, Any]],
+                        content_field: Optional[str] = None,
+                        title_field: Optional[str] = None,
+                        id_field: Optional[str] = None,
+                        *,
+                        options: Optional[DuplicateOptions] = None,
+                        **overrides: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Yield duplicate pairs as they are found; arguments are the same as for find_duplicates
+        
+        Candidate pairs are enumerated by index, so no pair is compared twice and nothing is
+        tracked per pair. Only when ids repeat across items is a compact bitset kept, covering
+        just the pairs that involve a repeated id.
+        """
+        options = DuplicateOptions.resolve(options, content_field, title_field, id_field, **overrides)
+        id_field = options.id_field
+        found = 0
+        comparisons = 0
+        tracker = PairTracker.for_ids([item.get(id_field) for item in items])
+        
+        logger.info(f"Checking {len(items)} items for duplicates...")
+        
+        for i, j, score in self._candidate_pairs(items, options):
+            if tracker is not None and not tracker.first_time(i, j):
+                continue
+            item1, item2 = items[i], items[j]
+            comparisons += 1
+            
+            try:
+                is_duplicate, stage = self._judge_pair(items, i, j, score, options)
+            except Exception as e:
+                logger.error(f"Error comparing items {item1.get(id_field)} and {item2.get(id_field)}: {str(e)}")
+                continue
+            
+            if is_duplicate is True:
+                duplicate = {
+                    'item1': item1,
+                    'item2': item2,
+                    'similarity': 'duplicate'
+                }
+                if score is not None:
+                    duplicate['score'] = score
+                if stage is not None:
+                    duplicate['stage'] = stage
+                found += 1
+                logger.info(f"Found duplicate: {item1.get(id_field)} and {item2.get(id_field)}")
+                yield duplicate
+        
+        logger.info(f"Found {found} duplicate pairs out of {comparisons} comparisons")
+        if options.cascade is not None:
+            logger.info(f"Cascade stage counters: {options.cascade.stats()}")
+    
+    def find_duplicate_clusters(self, items: List[Dict[str, Any]],
+                                content_field: Optional[str] = None,
+                                title_field: Optional[str] = None,
+                                id_field: Optional[str] = None,
+                                *,
+                                options: Optional[DuplicateOptions] = None,
+                                **overrides: Any) -> Dict[str, Any]:
+        """
+        Group duplicate items into clusters
+        
+        Duplicates are merged with a union-find structure, and a candidate pair is skipped
+        when both items already sit in the same cluster, so a group of n copies costs about
+        n - 1 comparisons instead of n * (n - 1) / 2.
+        
+        Args:
+            items: List of items to cluster
+            content_field, title_field, id_field: Field names, as for find_duplicates
+            options: DuplicateOptions, as for find_duplicates
+            **overrides: Individual DuplicateOptions fields applied on top of options
+            
+        Returns:
+            Dictionary with:
+                'labels': compact cluster id (0..k-1) per item, aligned with items
+                'clusters': lists of item ids for every cluster with more than one item
+                'comparisons': number of pairs actually judged
+                'skipped': candidate pairs skipped because they were already clustered
+        """
+        options = DuplicateOptions.resolve(options, content_field, title_field, id_field, **overrides)
+        id_field = options.id_field
+        clusters = UnionFind(len(items))
+        comparisons = 0
+        skipped = 0
+        
+        logger.info(f"Clustering {len(items)} items by duplicates...")
+        
+        for i, j, score in self._candidate_pairs(items, options):
+            if clusters.connected(i, j):
+                # Transitivity: already known duplicates need no further comparison
+                skipped += 1
+                continue
+            comparisons += 1
+            
+            try:
+                is_duplicate, _ = self._judge_pair(items, i, j, score, options)
+                if is_duplicate is True:
+                    clusters.union(i, j)
+                    logger.debug(f"Merged {items[i].get(id_field)} and {items[j].get(id_field)}")
+            except Exception as e:
+                logger.error(f"Error comparing items {items[i].get(id_field)} and {items[j].get(id_field)}: {str(e)}")
+                continue
+        
+        labels = clusters.labels()
+        members: Dict[int, List[Any]] = {}
+        for index, label in enumerate(labels):
+            members.setdefault(label, []).append(items[index].get(id_field))
+        groups = [ids for ids in members.values() if len(ids) > 1]
+        
+        logger.info(f"Found {len(groups)} duplicate clusters from {comparisons} comparisons "
+                    f"({skipped} skipped by transitivity)")
+        if options.cascade is not None:
+            logger.info(f"Cascade stage counters: {options.cascade.stats()}")
+        return {
+            'labels': labels,
+            'clusters': groups,
+            'comparisons': comparisons,
+            'skipped': skipped
+        }
+    
+    def _candidate_pairs(self, items: List[Dict[str, Any]],
+                         options: DuplicateOptions) -> Iterator[Tuple[int, int, Optional[float]]]:
+        """Yield (i, j, embedding score or None) candidate pairs for the configured strategy"""
+        content_field, title_field = options.content_field, options.title_field
+        if options.cascade is not None:
+            options.cascade.prepare([(item.get(title_field) or '', item.get(content_field) or '')
+                                     for item in items])
+        blocking = options.blocking()
+        if blocking is not None:
+            blocking.prepare(items)
+        
+        if options.embedding_top_k is not None:
+            pairs = self._embedding_candidate_pairs(items, content_field, title_field, options.embedding_top_k,
+                                                    options.embedding_escalate_threshold, options.vector_index)
+        elif options.candidate_threshold is not None:
+            pairs = ((i, j, None) for i, j in self._lsh_candidate_pairs(items, content_field, title_field,
+                                                                         options.candidate_threshold,
+                                                                         options.num_perm, options.lsh_bands))
+        elif blocking is not None:
+            # The sweep only ever produces pairs inside a block, no filtering needed
+            return ((i, j, None) for i, j in blocking.pairs())
+        else:
+            return ((i, j, None) for i in range(len(items)) for j in range(i + 1, len(items)))
+        
+        if blocking is None:
+            return pairs
+        return ((i, j, score) for i, j, score in pairs if blocking.allows(i, j))
+    
+    def _judge_pair(self, items: List[Dict[str, Any]], i: int, j: int, score: Optional[float],
+                    options: DuplicateOptions) -> Tuple[Optional[bool], Optional[str]]:
+        """Return (is duplicate, deciding cascade stage or None) for a candidate pair"""
+        if options.cascade is not None:
+            return options.cascade.decide(i, j)
+        if score is not None and score >= options.embedding_accept_threshold:
+            # Near-identical embeddings need no second opinion
+            return True, None
+        item1, item2 = items[i], items[j]
+        return self.detect_content_similarity(
+            item1.get(options.content_field, ''),
+            item2.get(options.content_field, ''),
+            item1.get(options.title_field, ''),
+            item2.get(options.title_field, '')
+        ), None
+    
+    def default_cascade(self,
+                        use_embeddings: bool = True,
+                        simhash_reject_distance: Optional[int] = 24,
+                        jaccard_reject_below: Optional[float] = 0.05,
+                        embedding_reject_below: Optional[float] = 0.75) -> DuplicateCascade:
+        """
+        Build the standard cheap-to-expensive duplicate cascade:
+        exact normalized hash -> SimHash -> shingle Jaccard -> embedding cosine -> Gemini verdict
+        
+        Args:
+            use_embeddings: Include the embedding stage (default: True)
+            simhash_reject_distance: SimHash distance at which pairs are rejected (None disables)
+            jaccard_reject_below: Jaccard estimate below which pairs are rejected (None disables)
+            embedding_reject_below: Cosine similarity below which pairs are rejected (None disables)
+            
+        Returns:
+            DuplicateCascade to pass to find_duplicates
+        """
+        stages = [
+            ExactHashStage(),
+            SimHashStage(reject_distance=simhash_reject_distance),
+            JaccardStage(reject_below=jaccard_reject_below),
+        ]
+        if use_embeddings:
+            stages.append(EmbeddingStage(self.gemini_service.embed_texts, reject_below=embedding_reject_below))
+        stages.append(ModelStage(self.detect_content_similarity))
+        return DuplicateCascade(stages)
+    
+    def _embedding_candidate_pairs(self,
+                                   items: List[Dict[str, Any]],
+                                   content_field: str,
+                                   title_field: str,
+                                   top_k: int,
+                                   min_score: float,
+                                   index_type: str) -> List[Tuple[int, int, float]]:
+        """
+        Generate index pairs from each item's nearest neighbours by embedding
+        
+        Returns:
+            List of (i, j, cosine similarity) with i < j and similarity >= min_score,
+            most similar pairs first
+        """
+        if not items:
+            return []
+        texts = [f"{item.get(title_field) or ''}\n{item.get(content_field) or ''}" for item in items]
+        vectors = self.gemini_service.embed_texts(texts)
+        dimension = len(vectors[0])
+        # numpy is only needed here; importing it lazily keeps module import fast
+        from .utils.vector_index import HNSWVectorIndex, VectorIndex
+        
+        if index_type == 'hnsw':
+            index = HNSWVectorIndex(dimension, max_elements=len(items))
+        elif index_type == 'exact':
+            index = VectorIndex(dimension)
+        else:
+            raise ValueError("vector_index must be 'exact' or 'hnsw'")
+        index.add(list(range(len(items))), vectors)
+        
+        scores: Dict[Tuple[int, int], float] = {}
+        # Each item finds itself as its own nearest neighbour, hence top_k + 1
+        for i, neighbours in enumerate(index.search(vectors, k=top_k + 1)):
+            for j, score in neighbours:
+                if i != j and score >= min_score:
+                    scores[(min(i, j), max(i, j))] = score
+        
+        logger.info(f"Embedding search kept {len(scores)} candidate pairs (top {top_k}, min cosine {min_score})")
+        return sorted(((i, j, score) for (i, j), score in scores.items()), key=lambda pair: -pair[2])
+    
+    def _lsh_candidate_pairs(self,
+                             items: List[Dict[str, Any]],
+                             content_field: str,
+                             title_field: str,
+                             threshold: float,
+                             num_perm: int,
+                             bands: Optional[int]) -> List[Tuple[int, int]]:
+        """
+        Generate index pairs of likely duplicates with MinHash LSH blocking
+        
+        Returns:
+            Sorted list of (i, j) index pairs, i < j, whose estimated Jaccard
+            similarity is at least threshold
+        """
+        hasher = MinHasher(num_perm=num_perm)
+        index = LSHIndex(num_perm=num_perm, threshold=threshold, bands=bands)
+        signatures = []
+        for i, item in enumerate(items):
+            text = f"{item.get(title_field) or ''} {item.get(content_field) or ''}"
+            signature = hasher.signature_for_text(text)
+            signatures.append(signature)
+            index.add(i, signature)
+        
+        candidates = sorted(
+            (i, j) for i, j in index.candidate_pairs()
+            if estimate_jaccard(signatures[i], signatures[j]) >= threshold
+        )
+        total_pairs = len(items) * (len(items) - 1) // 2
+        logger.info(f"LSH blocking kept {len(candidates)} of {total_pairs} pairs "
+                    f"({index.bands} bands x {index.rows} rows, threshold {threshold})")
+        return candidates
+
+class AsyncContentProcessor(ContentProcessor):
+    """
+    Content processor exposing asyncio counterparts of the model-backed operations
+    so many requests can be kept in flight from a single event loop
+    """
+    
+    async def aprocess_html_content(self, html_content: str, target_language: str = "English",
+                                    translate: bool = True) -> Optional[str]:
+        """
+        Async version of process_html_content
+        
+        Args:
+            html_content: Raw HTML content to process
+            target_language: Target language for translation (default: English)
+            translate: If False, the main text is extracted locally and the model is not called
+            
+        Returns:
+            Processed and translated content or None if processing fails
+        """
+        try:
+            return await self.gemini_service.aprocess_html_content(html_content, target_language, translate)
+        except Exception as e:
+            logger.error(f"HTML processing error: {str(e)}")
+            raise Exception(f"Failed to process HTML content: {str(e)}")
+    
+    async def aclean_translation(self, text: str) -> Optional[str]:
+        """
+        Async version of clean_translation
+        
+        Args:
+            text: Raw translated text to clean
+            
+        Returns:
+            Cleaned text or None if no valid content found
+        """
+        try:
+            return await self.gemini_service.aclean_translation(text)
+        except Exception as e:
+            logger.error(f"Translation cleaning error: {str(e)}")
+            raise Exception(f"Failed to clean translation: {str(e)}")
+    
+    async def aextract_article_content(self, text: str) -> Optional[ArticleContent]:
+        """
+        Async version of extract_article_content
+        
+        Args:
+            text: Raw text to extract article content from
+            
+        Returns:
+            ArticleContent dictionary (title, date, content, summary) or None if no
+            article content was found
+        """
+        try:
+            return await self.gemini_service.aextract_article_content(text)
+        except Exception as e:
+            logger.error(f"Content extraction error: {str(e)}")
+            raise Exception(f"Failed to extract content: {str(e)}")
+    
+    async def adetect_content_similarity(self, content1: str, content2: str, title1: str = "", title2: str = "") -> Optional[bool]:
+        """
+        Async version of detect_content_similarity
         
-        logger.info(f"Found {len(duplicates)} duplicate pairs out of {len(processed_pairs)} comparisons")
-        return duplicates
+        Args:
+            content1: First content to compare
+            content2: Second content to compare
+            title1: Optional title for first content
+            title2: Optional title for second content
+            
+        Returns:
+            True if content is duplicated/same, False if different, None if error
+        """
+        try:
+            return await self.gemini_service.adetect_content_similarity(content1, content2, title1, title2)
+        except Exception as e:
+            logger.error(f"Similarity detection error: {str(e)}")
+            return None
+    
+    async def aprocess_batch(self,
+                             items: List[Dict[str, Any]],
+                             content_field: str = 'content',
+                             id_field: str = 'id',
+                             process_func: Optional[Callable] = None,
+                             update_callback: Optional[Callable] = None,
+                             max_concurrency: int = 100) -> Dict[str, int]:
+        """
+        Process a batch of content items concurrently on the running event loop
+        
+        Args:
+            items: List of content items to process
+            content_field: Field name containing content to process (default: 'content')
+            id_field: Field name containing unique identifier (default: 'id')
+            process_func: Coroutine function used to process content. If None, uses aprocess_html_content
+            update_callback: Function to call with (id, processed_content, is_error) for each item.
+                May be a plain function or a coroutine function
+            max_concurrency: Maximum number of items in flight at once (default: 100)
+            
+        Returns:
+            Dictionary with processing statistics
+        """
+        if not process_func:
+            process_func = self.aprocess_html_content
+        
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        
+        logger.info(f"Starting async batch processing of {len(items)} items (max {max_concurrency} in flight)...")
+        
+        # A fixed pool of workers pulls from one iterator, so at most max_concurrency
+        # tasks exist at a time however many items there are
+        pending = iter(items)
+        stats = {'processed': 0, 'failed': 0, 'skipped': 0}
+        
+        async def worker() -> None:
+            for item in pending:
+                record = await self._aprocess_item(item, content_field, id_field, process_func, update_callback)
+                stats[record['status']] += 1
+        
+        await asyncio.gather(*(worker() for _ in range(min(max_concurrency, len(items)))))
+        
+        results = {
+            'processed': stats['processed'],
+            'failed': stats['failed'],
+            'skipped': stats['skipped'],
+            'total': len(items)
+        }
+        
+        logger.info(f"Async batch processing completed: {results}")
+        return results
+    
+    async def _aprocess_item(self,
+                             item: Dict[str, Any],
+                             content_field: str,
+                             id_field: str,
+                             process_func: Callable,
+                             update_callback: Optional[Callable]) -> Dict[str, Any]:
+        """
+        Async version of _process_item
+        
+        Returns:
+            Dictionary with the item 'id', its 'status' ('processed', 'failed' or 'skipped')
+            and 'result' (processed content, error message, or None)
+        """
+        async def notify(item_id: Any, content: str, is_error: bool) -> bool:
+            outcome = update_callback(item_id, content, is_error)
+            if inspect.isawaitable(outcome):
+                outcome = await outcome
+            return bool(outcome)
+        
+        item_id = item.get(id_field)
+        try:
+            content = item.get(content_field)
+            
+            if not content:
+                logger.warning(f"No content found for item {item_id}")
+                return {'id': item_id, 'status': 'skipped', 'result': None}
+            
+            logger.info(f"Processing item {item_id}...")
+            
+            result = await process_func(content)
+            
+            recorded = None
+            if update_callback:
+                recorded = await notify(item_id, *self._callback_args(result))
+            return self._outcome_record(item_id, result, recorded)
+        
+        except Exception as e:
+            item_id = item.get(id_field, 'unknown')
+            recorded, callback_error = None, None
+            if update_callback:
+                try:
+                    recorded = await notify(item_id, f"Processing failed: {str(e)}", True)
+                except Exception as cb_error:
+                    callback_error = cb_error
+            return self._failure_record(item_id, e, recorded, callback_error)
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Command line entry point
+
+    `python -m src.content_processor run --input items.jsonl --output results/` processes an
+    input in sharded worker processes (see src/runner.py). Without a command, runs a small demo.
+    """
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Destiny content processor')
+    commands = parser.add_subparsers(dest='command')
+    from .runner import build_parser, config_from_args, run
+    build_parser(commands.add_parser('run', help='Process a JSONL file or PostgreSQL input in parallel shards'))
+    commands.add_parser('demo', help='Process a single example item')
+    args = parser.parse_args(argv)
+    # Configured here rather than at import so library users keep control of logging
+    logging.basicConfig(level=getattr(args, 'log_level', None) or os.getenv('LOG_LEVEL', 'INFO'),
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    if args.command == 'run':
+        report = run(config_from_args(args))
+        print(json.dumps(report, indent=2))
+        return 1 if report['failed'] or report['sink_errors'] else 0
+    
+    demo()
+    return 0
+
 
-def main():
+def demo():
     """
-    Example main function showing how to use the ContentProcessor
+    Example function showing how to use the ContentProcessor
     """
     # Example usage
     processor = ContentProcessor()
@@ -280,4 +932,4 @@ def main():
     print(f"Skipped: {results['skipped']}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
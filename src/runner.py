@@ -0,0 +1,322 @@
+"""
+Sharded multi-process batch runner
+Splits an input (JSONL file by line number, PostgreSQL table/query by hash of the item
+id) across worker processes. Each worker owns its GeminiService, all workers draw from
+one SQLite-backed rate limit and record progress in one shared checkpoint store keyed
+by item id, so a run can be resumed with a different number of workers. Per-shard
+statistics are merged into a single report
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ('html', 'clean', 'extract')
+STAT_KEYS = ('processed', 'failed', 'skipped', 'resumed', 'total')
+
+
+def iter_jsonl(path: str, shard: int, shards: int) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the items of one shard from a JSON Lines file, skipping blank and malformed lines
+
+    Lines are assigned to shards by line number before decoding, so each worker only
+    parses its own share of the file.
+    """
+    with open(path, 'rb') as source:
+        for line_number, line in enumerate(source, 1):
+            if line_number % shards != shard or not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping malformed JSON on line {line_number} of {path}")
+
+
+class JSONLSink:
+    """
+    update_callback writing one JSON line per result to a shard-local file
+
+    Lines are buffered by the file object and fsynced by flush(), which the
+    checkpoint store calls before every sync.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Output file, appended to so resumed runs keep earlier results
+        """
+        self.path = path
+        self.rows_written = 0
+        self.flush_failures = 0
+        self._file = open(path, 'a', encoding='utf-8')
+        # process_stream calls the sink from worker threads, and the checkpoint store
+        # flushes it from whichever thread syncs; one lock keeps lines whole
+        self._lock = threading.Lock()
+
+    def __call__(self, item_id: Any, content: str, is_error: bool) -> bool:
+        key = 'error' if is_error else 'content'
+        line = json.dumps({'id': item_id, key: content}, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self.rows_written += 1
+        return True
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except Exception:
+            self.flush_failures += 1
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'rows_written': self.rows_written, 'flush_failures': self.flush_failures}
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._flush()
+            finally:
+                self._file.close()
+
+
+def _postgres_shard_source(config: Dict[str, Any], shard: int, shards: int):
+    from .services.postgres_service import PostgresSource
+
+    # hashtext is int4; shifting to non-negative bigint avoids abs() overflow on INT_MIN
+    id_column = '"' + config['id_field'].replace('"', '""') + '"'
+    condition = f"mod(hashtext(CAST({id_column} AS text))::bigint + 2147483648, %s) = %s"
+    if config.get('pg_query'):
+        query = f"SELECT * FROM ({config['pg_query']}) AS shard_source WHERE {condition}"
+        return PostgresSource(query=query, params=[shards, shard], itersize=config['itersize'])
+    columns = [config['id_field'], config['content_field']] + list(config.get('extra_columns') or [])
+    return PostgresSource(
+        table=config['pg_table'],
+        columns=columns,
+        pending_column=config.get('pg_pending_column'),
+        where=condition,
+        params=[shards, shard],
+        order_by=config['id_field'],
+        itersize=config['itersize'],
+    )
+
+
+def _process_func(processor, config: Dict[str, Any]):
+    operation = config['operation']
+    if operation == 'html':
+        return lambda content: processor.process_html_content(content, config['target_language'])
+    if operation == 'clean':
+        return processor.clean_translation
+
+    def extract(content: str) -> Optional[str]:
+        result = processor.extract_article_content(content)
+        return json.dumps(result, ensure_ascii=False) if result else None
+    return extract
+
+
+def run_shard(config: Dict[str, Any], shard: int, shards: int) -> Dict[str, Any]:
+    """
+    Process one shard of the input in the current process
+
+    Args:
+        config: Run options (see build_parser); must be picklable
+        shard: Index of the shard to process
+        shards: Total number of shards
+
+    Returns:
+        Statistics of the shard: item counts per status, elapsed seconds and cache stats
+    """
+    from .content_processor import ContentProcessor
+    from .services.gemini_service import GeminiService
+    from .services.model_backend import HTTPBackend
+    from .utils.cache import SQLiteCache
+    from .utils.checkpoint import SQLiteCheckpointStore
+    from .utils.rate_limiter import SQLiteRateLimiter
+    from .utils.retry import RetryPolicy
+
+    logging.basicConfig(level=config['log_level'], format='%(asctime)s - %(process)d - %(levelname)s - %(message)s',
+                        force=True)
+    started = time.monotonic()
+    state_dir = config['state_dir']
+
+    limiter = None
+    if config['requests_per_minute'] or config['tokens_per_minute']:
+        limiter = SQLiteRateLimiter(os.path.join(state_dir, 'rate_limits.sqlite'),
+                                    requests_per_minute=config['requests_per_minute'],
+                                    tokens_per_minute=config['tokens_per_minute'])
+    cache = SQLiteCache(os.path.join(state_dir, 'cache.sqlite')) if config['cache'] else None
+    backend = None
+    if config.get('backend_url'):
+        backend = HTTPBackend(config['backend_url'], config['model'], api_key=os.getenv('GEMINI_API_KEY'),
+                              api_style=config['api_style'], pool_size=config['threads'])
+    service = GeminiService(
+        model_name=config['model'],
+        backend=backend,
+        cache=cache,
+        rate_limiter=limiter,
+        retry_policy=RetryPolicy(max_attempts=config['max_attempts']),
+        pre_extract_html=config['pre_extract_html'],
+    )
+    processor = ContentProcessor(gemini_service=service)
+
+    if config.get('output'):
+        sink = JSONLSink(os.path.join(config['output'], f"results-{shard:04d}.jsonl"))
+    else:
+        from .services.postgres_service import PostgresSink
+        sink = PostgresSink(config['pg_output_table'], id_column=config['id_field'],
+                            content_column=config['pg_output_column'],
+                            error_column=config.get('pg_error_column'))
+
+    if config.get('input'):
+        items = iter_jsonl(config['input'], shard, shards)
+    else:
+        items = _postgres_shard_source(config, shard, shards)
+
+    stats = {key: 0 for key in STAT_KEYS}
+    flush_errors: List[Exception] = []
+    sink_errors: List[str] = []
+
+    def flush_sink() -> None:
+        try:
+            sink.flush()
+        except Exception as e:
+            flush_errors.append(e)
+            raise
+
+    # One store for all shards: resuming does not depend on how items were split
+    checkpoint = SQLiteCheckpointStore(os.path.join(state_dir, 'checkpoint.sqlite'), before_sync=flush_sink)
+    try:
+        for record in processor.process_stream(items, config['content_field'], config['id_field'],
+                                               _process_func(processor, config), sink,
+                                               max_workers=config['threads'], checkpoint=checkpoint):
+            stats[record['status']] += 1
+            stats['total'] += 1
+    except Exception as e:
+        # The stream's final checkpoint flush re-raises a sink failure; it is reported in the stats
+        if not (flush_errors and e is flush_errors[-1]):
+            raise
+    finally:
+        # Items whose results were not written stay uncheckpointed, so the next run redoes them
+        for close in (checkpoint.close, sink.close):
+            try:
+                close()
+            except Exception as e:
+                logger.error(f"Shard {shard}/{shards} could not write its last results: {str(e)}")
+                sink_errors.append(str(e))
+        if limiter is not None:
+            limiter.close()
+        service.backend.close()
+
+    stats['sink'] = sink.stats()
+    stats['sink_errors'] = sink_errors
+    stats['shard'] = shard
+    stats['elapsed'] = round(time.monotonic() - started, 3)
+    if cache is not None:
+        stats['cache'] = cache.stats()
+        cache.close()
+    logger.info(f"Shard {shard}/{shards} finished: {stats}")
+    return stats
+
+
+def merge_stats(shard_stats: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Combine per-shard statistics into one report"""
+    report: Dict[str, Any] = {key: sum(s.get(key, 0) for s in shard_stats) for key in STAT_KEYS}
+    report['shards'] = len(shard_stats)
+    report['elapsed'] = round(elapsed, 3)
+    report['items_per_second'] = round(report['total'] / elapsed, 2) if elapsed > 0 else 0.0
+    report['slowest_shard_elapsed'] = max((s['elapsed'] for s in shard_stats), default=0.0)
+    sinks = [s['sink'] for s in shard_stats if 'sink' in s]
+    report['sink'] = {key: sum(k.get(key, 0) for k in sinks) for key in ('rows_written', 'flush_failures', 'buffered')}
+    report['sink_errors'] = [error for s in shard_stats for error in s.get('sink_errors', [])]
+    caches = [s['cache'] for s in shard_stats if 'cache' in s]
+    if caches:
+        report['cache'] = {key: sum(c.get(key, 0) for c in caches) for key in ('hits', 'misses')}
+    report['per_shard'] = sorted(shard_stats, key=lambda s: s['shard'])
+    return report
+
+
+def run(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run every shard in its own process and return the merged report
+
+    Workers are started with the spawn method: the gRPC stack used by the Gemini SDK
+    is not fork-safe.
+    """
+    os.makedirs(config['state_dir'], exist_ok=True)
+    if config.get('output'):
+        os.makedirs(config['output'], exist_ok=True)
+    shards = config['workers']
+    started = time.monotonic()
+
+    if shards == 1:
+        results = [run_shard(config, 0, 1)]
+    else:
+        results = []
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=shards, mp_context=context) as executor:
+            futures = [executor.submit(run_shard, config, shard, shards) for shard in range(shards)]
+            for future in as_completed(futures):
+                results.append(future.result())
+
+    return merge_stats(results, time.monotonic() - started)
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    """Add the run options to parser (or a new parser)"""
+    parser = parser or argparse.ArgumentParser(description='Process items in parallel shards')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help='JSON Lines input file')
+    source.add_argument('--pg-table', help='PostgreSQL table to read items from')
+    source.add_argument('--pg-query', help='PostgreSQL SELECT returning the items (escape literal %% as %%%%)')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--output', help='Directory receiving one results-NNNN.jsonl file per shard')
+    target.add_argument('--pg-output-table', help='PostgreSQL table updated with results')
+    parser.add_argument('--pg-output-column', default='content', help='Column receiving results (default: content)')
+    errors = parser.add_mutually_exclusive_group()
+    errors.add_argument('--pg-error-column', default='processing_error',
+                        help='Column receiving error messages (default: processing_error)')
+    errors.add_argument('--no-pg-error-column', dest='pg_error_column', action='store_const', const=None,
+                        help='Do not write error messages, for tables without an error column')
+    parser.add_argument('--pg-pending-column', help='Only read rows where this column IS NULL (--pg-table only)')
+    parser.add_argument('--extra-columns', nargs='*', default=[], help='Additional columns to read (--pg-table only)')
+    parser.add_argument('--itersize', type=int, default=2000, help='Rows fetched per round trip (default: 2000)')
+    parser.add_argument('--operation', choices=OPERATIONS, default='html',
+                        help='html: extract and translate HTML, clean: clean translations, '
+                             'extract: structured article extraction (default: html)')
+    parser.add_argument('--target-language', default='English')
+    parser.add_argument('--id-field', default='id')
+    parser.add_argument('--content-field', default='content')
+    parser.add_argument('--model', default=os.getenv('GEMINI_MODEL', 'gemini-1.5-flash'))
+    parser.add_argument('--backend-url', help='OpenAI- or Gemini-compatible endpoint to use instead of the Gemini SDK')
+    parser.add_argument('--api-style', choices=('openai', 'gemini'), default='openai',
+                        help='Wire format of --backend-url (default: openai)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (default: CPU count)')
+    parser.add_argument('--threads', type=int, default=8, help='Items in flight per worker (default: 8)')
+    parser.add_argument('--requests-per-minute', type=float, help='Request quota shared by all workers')
+    parser.add_argument('--tokens-per-minute', type=float, help='Token quota shared by all workers')
+    parser.add_argument('--max-attempts', type=int, default=5, help='Attempts per API call (default: 5)')
+    parser.add_argument('--cache', action='store_true', help='Share a SQLite response cache between workers')
+    parser.add_argument('--pre-extract-html', action='store_true', help='Strip HTML boilerplate before prompting')
+    parser.add_argument('--state-dir', default='.destiny',
+                        help='Directory for checkpoints, rate limits and cache (default: .destiny)')
+    parser.add_argument('--log-level', default=os.getenv('LOG_LEVEL', 'WARNING'))
+    return parser
+
+
+def config_from_args(args: argparse.Namespace) -> Dict[str, Any]:
+    """Convert parsed arguments into the picklable run configuration"""
+    if args.workers < 1:
+        raise ValueError("--workers must be at least 1")
+    return {key: value for key, value in vars(args).items() if key != 'command'}
@@ -4,29 +4,201 @@ A clean, reusable service for AI-powered content processing tasks
 """
 import os
 import json
+import time
+import asyncio
 import logging
-import google.generativeai as genai
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypedDict
+from .model_backend import GeminiBackend, ModelBackend
+from ..utils.cache import ResponseCache, make_cache_key
+from ..utils.html_extractor import extract_main_text
+from ..utils.metrics import MetricsRecorder
+from ..utils.rate_limiter import RateLimiter
+from ..utils.retry import RetryPolicy
+from ..utils.tokens import TokenCounter, context_window, estimate_tokens, max_output_tokens
 
 logger = logging.getLogger(__name__)
 
+
+def _strip_code_fence(text: str) -> str:
+    """Remove a markdown code fence (```json ... ```) around the answer, even after leading prose"""
+    text = text.strip()
+    start = text.find("```")
+    if start != -1:
+        text = text[start + 3:]
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        end = text.rfind("```")
+        if end != -1:
+            text = text[:end]
+    return text.strip()
+
+
+def _load_json(text: str) -> Any:
+    """
+    Parse JSON from a model answer, tolerating code fences and surrounding prose
+
+    Tries the plain text first (the common case with JSON output mode), then the
+    fenced block, then the first JSON object or array in the text.
+
+    Raises:
+        ValueError: If no JSON value can be recovered
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    unfenced = _strip_code_fence(text)
+    try:
+        return json.loads(unfenced)
+    except ValueError:
+        pass
+    starts = [index for index in (unfenced.find('{'), unfenced.find('[')) if index != -1]
+    if not starts:
+        raise ValueError("No JSON value found in response")
+    value, _ = json.JSONDecoder().raw_decode(unfenced, min(starts))
+    return value
+
+
+def _load_json_entries(text: str) -> List[Any]:
+    """
+    Recover the complete elements of a JSON array cut off mid-way (e.g. at the output token limit)
+
+    Returns:
+        Elements decoded before the first incomplete one; empty if no array starts in text
+    """
+    text = _strip_code_fence(text)
+    start = text.find('[')
+    if start == -1:
+        return []
+    decoder = json.JSONDecoder()
+    entries = []
+    position = start + 1
+    while True:
+        while position < len(text) and text[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(text) or text[position] == ']':
+            return entries
+        try:
+            entry, position = decoder.raw_decode(text, position)
+        except ValueError:
+            return entries
+        entries.append(entry)
+
+
+class ArticleContent(TypedDict):
+    """Structured result of extract_article_content"""
+    title: Optional[str]
+    date: Optional[str]
+    content: str
+    summary: Optional[str]
+
+
+# Response schema for extract_article_content (OpenAPI subset accepted by Gemini JSON mode)
+ARTICLE_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'title': {'type': 'STRING', 'nullable': True},
+        'date': {'type': 'STRING', 'nullable': True},
+        'content': {'type': 'STRING', 'nullable': True},
+        'summary': {'type': 'STRING', 'nullable': True},
+    },
+    'required': ['title', 'date', 'content', 'summary'],
+}
+
+
 class GeminiService:
-    def __init__(self, api_key: Optional[str] = None, model_name: str = 'gemini-1.5-flash'):
+    # Bump a method's version whenever its prompt or parsing changes to invalidate cached results
+    PROMPT_VERSIONS = {
+        'clean_translation': 1,
+        'extract_article_content': 2,
+        'detect_content_similarity': 2,
+        'process_html_content': 2,
+        'embed_texts': 1,
+    }
+    
+    # Tokens of the context window kept free for the model's answer
+    OUTPUT_TOKEN_RESERVE = 8192
+    
+    # Input limit of the embedding model, per text
+    EMBEDDING_INPUT_TOKENS = 2048
+    
+    # Requests per extract_article_content call; answers are re-asked only when they are not valid JSON
+    EXTRACT_MAX_ATTEMPTS = 2
+    
+    def __init__(self, api_key: Optional[str] = None, model_name: str = 'gemini-1.5-flash',
+                 cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 pre_extract_html: bool = False,
+                 max_input_tokens: int = 8000,
+                 similarity_tokens_per_article: int = 500,
+                 long_document_mode: str = 'truncate',
+                 chunk_workers: int = 4,
+                 count_tokens_with_model: bool = False,
+                 embedding_model: str = 'models/text-embedding-004',
+                 metrics: Optional[MetricsRecorder] = None,
+                 backend: Optional[ModelBackend] = None):
         """
         Initialize Gemini API client
         
         Args:
             api_key: Google Gemini API key. If None, will read from GEMINI_API_KEY env var
             model_name: Gemini model to use (default: gemini-1.5-flash)
+            cache: Optional response cache (e.g. MemoryCache or SQLiteCache) used to
+                skip model calls for inputs that were already processed
+            rate_limiter: Optional rate limiter every model call acquires from. Share one
+                instance (or one SQLiteRateLimiter path) to apply a single quota across services
+            retry_policy: Optional retry policy for transient API failures (429, 503, timeouts).
+                If None, failed calls are not retried
+            pre_extract_html: Strip boilerplate (scripts, navigation, footers...) locally and
+                send only the candidate main text to the model (default: False)
+            max_input_tokens: Token budget for the document in process_html_content, capped
+                by the model's context window (default: 8000)
+            similarity_tokens_per_article: Token budget per article in detect_content_similarity (default: 500)
+            long_document_mode: 'truncate' cuts documents over budget; 'chunk' splits them,
+                processes the chunks in parallel and joins the results (default: 'truncate')
+            chunk_workers: Parallel requests per document in chunk mode (default: 4)
+            count_tokens_with_model: Use the model's count_tokens API instead of the local
+                estimate for budgeting. Counts are memoized and fall back to the estimate on error.
+                Async methods run the counting on a worker thread
+            embedding_model: Model used by embed_texts (default: models/text-embedding-004)
+            metrics: Optional MetricsRecorder receiving latency, queue wait, token, retry and
+                cache events for every model call and cache lookup
+            backend: Model backend to send requests to (e.g. HTTPBackend for a local or
+                compatible endpoint). If None, the Gemini SDK is used with api_key and model_name;
+                otherwise api_key is not needed and model_name is taken from the backend
         """
-        if not api_key:
-            api_key = os.getenv('GEMINI_API_KEY')
+        if long_document_mode not in ('truncate', 'chunk'):
+            raise ValueError("long_document_mode must be 'truncate' or 'chunk'")
         
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found. Please provide api_key parameter or set GEMINI_API_KEY environment variable")
+        if backend is None:
+            if not api_key:
+                api_key = os.getenv('GEMINI_API_KEY')
+            
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY not found. Please provide api_key parameter or set GEMINI_API_KEY environment variable")
+            
+            backend = GeminiBackend(model_name, api_key)
         
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
+        self.backend = backend
+        model_name = backend.model_name
+        self.model_name = model_name
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.pre_extract_html = pre_extract_html
+        self.max_input_tokens = min(max_input_tokens, context_window(model_name) - self.OUTPUT_TOKEN_RESERVE)
+        self.similarity_tokens_per_article = similarity_tokens_per_article
+        self.long_document_mode = long_document_mode
+        self.chunk_workers = chunk_workers
+        self.token_counter = TokenCounter(self._count_model_tokens if count_tokens_with_model else None)
+        self.embedding_model = embedding_model
+        self.metrics = metrics
+    
+    @property
+    def model(self) -> Any:
+        """SDK model object of the Gemini backend (None for other backends)"""
+        return getattr(self.backend, 'model', None)
     
     def clean_translation(self, text: str) -> Optional[str]:
         """
@@ -40,7 +212,37 @@ class GeminiService:
             Cleaned text or None if no valid content found
         """
         try:
-            prompt = """
+            key, cached = self._cache_lookup('clean_translation', text)
+            if cached is not None:
+                return cached
+            response = self._generate(self._clean_translation_prompt(text), method='clean_translation')
+            return self._cache_store(key, self._parse_clean_translation(response))
+        except Exception as e:
+            logger.error(f"Gemini API error: {str(e)}")
+            raise Exception(f"Failed to clean text: {str(e)}")
+    
+    async def aclean_translation(self, text: str) -> Optional[str]:
+        """
+        Async version of clean_translation
+        
+        Args:
+            text: Raw translated text to clean
+            
+        Returns:
+            Cleaned text or None if no valid content found
+        """
+        try:
+            key, cached = self._cache_lookup('clean_translation', text)
+            if cached is not None:
+                return cached
+            response = await self._agenerate(self._clean_translation_prompt(text), method='clean_translation')
+            return self._cache_store(key, self._parse_clean_translation(response))
+        except Exception as e:
+            logger.error(f"Gemini API error: {str(e)}")
+            raise Exception(f"Failed to clean text: {str(e)}")
+    
+    def _clean_translation_prompt(self, text: str) -> str:
+        prompt = """
             Please clean the following translated text by:
             1. Remove all mentions of "The provided HTML content..."
             2. Remove any technical messages about missing content or HTML parsing
@@ -53,62 +255,133 @@ class GeminiService:
             
             Text to clean:
             """
+        return prompt + "\n\n" + text
+    
+    def _parse_clean_translation(self, response) -> Optional[str]:
+        if response and response.text:
+            cleaned = response.text.strip()
+            # Check if the response indicates no content
+            if "no valid content" in cleaned.lower() or "no article content" in cleaned.lower():
+                return None
+            return cleaned
+        
+        return None
+    
+    def extract_article_content(self, text: str) -> Optional[ArticleContent]:
+        """
+        Extract and structure article content from messy translation
+        
+        Args:
+            text: Raw text to extract article content from
             
-            response = self.model.generate_content(prompt + "\n\n" + text)
-            
-            if response and response.text:
-                cleaned = response.text.strip()
-                # Check if the response indicates no content
-                if "no valid content" in cleaned.lower() or "no article content" in cleaned.lower():
-                    return None
-                return cleaned
-            
-            return None
-            
+        Returns:
+            ArticleContent dictionary (title, date, content, summary) or None if no
+            article content was found
+        """
+        try:
+            key, cached = self._cache_lookup('extract_article_content', text)
+            if cached is not None:
+                return cached
+            for attempt in range(self.EXTRACT_MAX_ATTEMPTS):
+                response = self._generate(self._extract_article_prompt(text, attempt),
+                                          generation_config=self._extract_article_config(),
+                                          method='extract_article_content')
+                parsed, result = self._parse_extract_article(response)
+                if parsed:
+                    return self._cache_store(key, result)
+                logger.warning(f"Article extraction returned invalid JSON "
+                               f"(attempt {attempt + 1}/{self.EXTRACT_MAX_ATTEMPTS})")
+            return self._unparsed_article(response)
         except Exception as e:
-            logger.error(f"Gemini API error: {str(e)}")
-            raise Exception(f"Failed to clean text: {str(e)}")
+            logger.error(f"Gemini extraction error: {str(e)}")
+            raise Exception(f"Failed to extract content: {str(e)}")
     
-    def extract_article_content(self, text: str) -> Optional[dict]:
+    async def aextract_article_content(self, text: str) -> Optional[ArticleContent]:
         """
-        Extract and structure article content from messy translation
+        Async version of extract_article_content
         
         Args:
             text: Raw text to extract article content from
             
         Returns:
-            Dictionary with structured content or None if extraction fails
+            ArticleContent dictionary (title, date, content, summary) or None if no
+            article content was found
         """
         try:
-            prompt = """
+            key, cached = self._cache_lookup('extract_article_content', text)
+            if cached is not None:
+                return cached
+            for attempt in range(self.EXTRACT_MAX_ATTEMPTS):
+                response = await self._agenerate(self._extract_article_prompt(text, attempt),
+                                                 generation_config=self._extract_article_config(),
+                                                 method='extract_article_content')
+                parsed, result = self._parse_extract_article(response)
+                if parsed:
+                    return self._cache_store(key, result)
+                logger.warning(f"Article extraction returned invalid JSON "
+                               f"(attempt {attempt + 1}/{self.EXTRACT_MAX_ATTEMPTS})")
+            return self._unparsed_article(response)
+        except Exception as e:
+            logger.error(f"Gemini extraction error: {str(e)}")
+            raise Exception(f"Failed to extract content: {str(e)}")
+    
+    def _extract_article_prompt(self, text: str, attempt: int = 0) -> str:
+        # Re-asks spell out the output format again, since the previous answer was not valid JSON
+        reminder = "Return ONLY the JSON object, without markdown code fences or any other text." if attempt else ""
+        prompt = f"""
             Extract the main article content from this text and return it in JSON format with these fields:
             - title: The article title
-            - date: Publication date (if found)
+            - date: Publication date (if found, otherwise null)
             - content: The main article body (cleaned and properly formatted)
             - summary: A brief 2-3 sentence summary
             
             Remove all HTML parsing errors, navigation elements, and metadata.
-            If no valid article content exists, return {"error": "No valid content found"}
+            If no valid article content exists, set content to null.
+            {reminder}
             
             Text to process:
             """
-            
-            response = self.model.generate_content(prompt + "\n\n" + text)
-            
-            if response and response.text:
-                try:
-                    # Try to parse as JSON
-                    result = json.loads(response.text)
-                    return result
-                except json.JSONDecodeError:
-                    # If not valid JSON, return as plain text
-                    return {"content": response.text}
-            
+        return prompt + "\n\n" + text
+    
+    @staticmethod
+    def _extract_article_config() -> Dict[str, Any]:
+        return {'response_mime_type': 'application/json', 'response_schema': ARTICLE_SCHEMA}
+    
+    def _parse_extract_article(self, response) -> Tuple[bool, Optional[ArticleContent]]:
+        """
+        Parse a structured extraction answer
+        
+        Returns:
+            Tuple of (parsed, result). parsed is False when the answer is not a JSON object
+            and should be asked again; result is None when the text has no article content
+        """
+        if not (response and response.text):
+            return True, None
+        try:
+            data = _load_json(response.text)
+        except ValueError:
+            return False, None
+        if isinstance(data, list) and len(data) == 1:
+            data = data[0]
+        if not isinstance(data, dict):
+            return False, None
+        
+        fields = {}
+        for field in ('title', 'date', 'content', 'summary'):
+            value = data.get(field)
+            if value is not None:
+                value = (value if isinstance(value, str) else str(value)).strip() or None
+            fields[field] = value
+        if not fields['content'] or "no valid content" in fields['content'].lower():
+            return True, None
+        return True, ArticleContent(**fields)
+    
+    @staticmethod
+    def _unparsed_article(response) -> Optional[ArticleContent]:
+        """Last resort after every attempt failed to parse: keep the text, but do not cache it"""
+        if not (response and response.text):
             return None
-            
-        except Exception as e:
-            logger.error(f"Gemini extraction error: {str(e)}")
-            raise Exception(f"Failed to extract content: {str(e)}")
+        return ArticleContent(title=None, date=None, content=_strip_code_fence(response.text), summary=None)
     
     def detect_content_similarity(self, content1: str, content2: str, title1: str = "", title2: str = "") -> Optional[bool]:
         """
@@ -124,7 +397,46 @@ class GeminiService:
             True if content is duplicated/same, False if different, None if error
         """
         try:
-            prompt = f"""Compare these two articles and determine if they are substantially the same content (duplicates) or different articles.
+            # Similarity is symmetric, so both orderings of a pair share one cache entry
+            key, cached = self._cache_lookup('detect_content_similarity', self.similarity_tokens_per_article,
+                                             *sorted([(title1, content1), (title2, content2)]))
+            if cached is not None:
+                return cached
+            response = self._generate(self._similarity_prompt(content1, content2, title1, title2),
+                                      method='detect_content_similarity')
+            return self._cache_store(key, self._parse_similarity(response))
+        except Exception as e:
+            logger.error(f"Gemini API error: {str(e)}")
+            return None
+    
+    async def adetect_content_similarity(self, content1: str, content2: str, title1: str = "", title2: str = "") -> Optional[bool]:
+        """
+        Async version of detect_content_similarity
+        
+        Args:
+            content1: First content to compare
+            content2: Second content to compare
+            title1: Optional title for first content
+            title2: Optional title for second content
+            
+        Returns:
+            True if content is duplicated/same, False if different, None if error
+        """
+        try:
+            # Similarity is symmetric, so both orderings of a pair share one cache entry
+            key, cached = self._cache_lookup('detect_content_similarity', self.similarity_tokens_per_article,
+                                             *sorted([(title1, content1), (title2, content2)]))
+            if cached is not None:
+                return cached
+            prompt = await self._atokens(self._similarity_prompt, content1, content2, title1, title2)
+            response = await self._agenerate(prompt, method='detect_content_similarity')
+            return self._cache_store(key, self._parse_similarity(response))
+        except Exception as e:
+            logger.error(f"Gemini API error: {str(e)}")
+            return None
+    
+    def _similarity_prompt(self, content1: str, content2: str, title1: str, title2: str) -> str:
+        return f"""Compare these two articles and determine if they are substantially the same content (duplicates) or different articles.
 
 Consider them duplicates if they:
 - Report the same news event or story
@@ -142,45 +454,150 @@ Return ONLY "DUPLICATE" if they are the same content, or "DIFFERENT" if they are
 
 Article 1 Title: {title1}
 Article 1 Content:
-{content1[:2000]}
+{self.token_counter.truncate(content1, self.similarity_tokens_per_article)}
 
 Article 2 Title: {title2}
 Article 2 Content:
-{content2[:2000]}
+{self.token_counter.truncate(content2, self.similarity_tokens_per_article)}
 
 Response:"""
+    
+    def _parse_similarity(self, response) -> Optional[bool]:
+        if response and response.text:
+            result = response.text.strip().upper()
+            if "DUPLICATE" in result:
+                return True
+            elif "DIFFERENT" in result:
+                return False
+            else:
+                logger.warning(f"Unexpected Gemini response: {result}")
+                return None
+        
+        return None
+    
+    def process_html_content(self, html_content: str, target_language: str = "English",
+                             translate: bool = True) -> Optional[str]:
+        """
+        Process raw HTML content by extracting main article text and translating
+        
+        Args:
+            html_content: Raw HTML content to process
+            target_language: Target language for translation (default: English)
+            translate: If False, the main text is extracted locally and the model is not called
             
-            response = self.model.generate_content(prompt)
-            
-            if response and response.text:
-                result = response.text.strip().upper()
-                if "DUPLICATE" in result:
-                    return True
-                elif "DIFFERENT" in result:
-                    return False
-                else:
-                    logger.warning(f"Unexpected Gemini response: {result}")
-                    return None
-            
-            return None
-            
+        Returns:
+            Processed and translated content or None if processing fails
+        """
+        if not translate:
+            return extract_main_text(html_content) or None
+        try:
+            key, cached = self._html_cache_lookup(html_content, target_language)
+            if cached is not None:
+                return cached
+            content = self._prepare_html(html_content)
+            if self._needs_chunking(content):
+                return self._cache_store(key, self._process_html_chunks(content, target_language))
+            response = self._generate(self._html_prompt(self._fit_input(content), target_language),
+                                      method='process_html_content')
+            return self._cache_store(key, self._parse_html_response(response))
         except Exception as e:
-            logger.error(f"Gemini API error: {str(e)}")
-            return None
+            logger.error(f"HTML processing error: {str(e)}")
+            raise Exception(f"Failed to process HTML content: {str(e)}")
     
-    def process_html_content(self, html_content: str, target_language: str = "English") -> Optional[str]:
+    async def aprocess_html_content(self, html_content: str, target_language: str = "English",
+                                    translate: bool = True) -> Optional[str]:
         """
-        Process raw HTML content by extracting main article text and translating
+        Async version of process_html_content
         
         Args:
             html_content: Raw HTML content to process
             target_language: Target language for translation (default: English)
+            translate: If False, the main text is extracted locally and the model is not called
             
         Returns:
             Processed and translated content or None if processing fails
         """
+        if not translate:
+            return extract_main_text(html_content) or None
         try:
-            prompt = f"""
+            key, cached = self._html_cache_lookup(html_content, target_language)
+            if cached is not None:
+                return cached
+            content = self._prepare_html(html_content)
+            if await self._atokens(self._needs_chunking, content):
+                return self._cache_store(key, await self._aprocess_html_chunks(content, target_language))
+            content = await self._atokens(self._fit_input, content)
+            response = await self._agenerate(self._html_prompt(content, target_language),
+                                             method='process_html_content')
+            return self._cache_store(key, self._parse_html_response(response))
+        except Exception as e:
+            logger.error(f"HTML processing error: {str(e)}")
+            raise Exception(f"Failed to process HTML content: {str(e)}")
+    
+    def _prepare_html(self, html_content: str) -> str:
+        """Reduce HTML to its candidate main text when pre-extraction is enabled"""
+        if not self.pre_extract_html:
+            return html_content
+        # Fall back to the raw document when nothing recognisable was found (e.g. script-rendered pages)
+        return extract_main_text(html_content) or html_content
+    
+    def _html_cache_lookup(self, html_content: str, target_language: str) -> Tuple[Optional[str], Optional[Any]]:
+        # Every setting that changes what the model sees is part of the key
+        return self._cache_lookup('process_html_content', html_content, target_language, self.pre_extract_html,
+                                  self.max_input_tokens, self.long_document_mode)
+    
+    def _fit_input(self, content: str) -> str:
+        """Truncate content to the input token budget"""
+        return self.token_counter.truncate(content, self.max_input_tokens)
+    
+    def _needs_chunking(self, content: str) -> bool:
+        return self.long_document_mode == 'chunk' and self.token_counter.count(content) > self.max_input_tokens
+    
+    async def _atokens(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run token budgeting (counting, truncation, chunking, prompts built from them) from async code
+        
+        With count_tokens_with_model, counting makes blocking count_tokens requests under the
+        sync rate limiter and retry policy, so the work runs on a worker thread instead of
+        stalling the event loop. The local estimate is cheap and runs inline.
+        """
+        if self.token_counter.count_func is None:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+    
+    def _process_html_chunks(self, content: str, target_language: str) -> Optional[str]:
+        """Map-reduce a long document: process token-sized chunks in parallel and join the results"""
+        chunks = self.token_counter.chunk(content, self.max_input_tokens)
+        logger.info(f"Processing long document in {len(chunks)} chunks")
+        
+        def run(chunk: str) -> Optional[str]:
+            return self._parse_html_response(self._generate(self._html_prompt(chunk, target_language),
+                                                            method='process_html_content'))
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(self.chunk_workers, len(chunks)))) as executor:
+            parts = list(executor.map(run, chunks))
+        return self._join_chunks(parts)
+    
+    async def _aprocess_html_chunks(self, content: str, target_language: str) -> Optional[str]:
+        """Async version of _process_html_chunks"""
+        chunks = await self._atokens(self.token_counter.chunk, content, self.max_input_tokens)
+        logger.info(f"Processing long document in {len(chunks)} chunks")
+        semaphore = asyncio.Semaphore(max(1, self.chunk_workers))
+        
+        async def run(chunk: str) -> Optional[str]:
+            async with semaphore:
+                return self._parse_html_response(await self._agenerate(self._html_prompt(chunk, target_language),
+                                                                       method='process_html_content'))
+        
+        return self._join_chunks(await asyncio.gather(*(run(chunk) for chunk in chunks)))
+    
+    @staticmethod
+    def _join_chunks(parts: List[Optional[str]]) -> Optional[str]:
+        kept = [part for part in parts if part]
+        return "\n\n".join(kept) if kept else None
+    
+    def _html_prompt(self, html_content: str, target_language: str) -> str:
+        prompt = f"""
             Extract and translate the main article content from this HTML.
             
             Instructions:
@@ -192,17 +609,338 @@ Response:"""
             
             HTML Content:
             """
+        return prompt + "\n\n" + html_content
+    
+    def _parse_html_response(self, response) -> Optional[str]:
+        if response and response.text:
+            result = response.text.strip()
+            if "no article content" in result.lower() or "no meaningful content" in result.lower():
+                return None
+            return result
+        
+        return None
+    
+    def process_html_batch(self,
+                           html_list: List[str],
+                           target_language: str = "English",
+                           max_prompt_tokens: int = 30000,
+                           max_items_per_request: int = 20,
+                           output_ratio: float = 1.0) -> List[Optional[str]]:
+        """
+        Process several HTML documents with as few model requests as possible
+        
+        Documents are bin-packed into prompts by estimated input tokens and by expected
+        output tokens, so that the JSON array answer fits the model's output limit. Results
+        are split back out; complete entries of a truncated answer are kept. Documents missing
+        from a response, or too large to share a response, go through process_html_content.
+        
+        Args:
+            html_list: Raw HTML documents to process
+            target_language: Target language for translation (default: English)
+            max_prompt_tokens: Estimated token budget of a single packed prompt (default: 30000)
+            max_items_per_request: Maximum documents packed into one prompt (default: 20)
+            output_ratio: Expected output tokens per input token of a document; extraction and
+                translation return about as much text as they get (default: 1.0)
+            
+        Returns:
+            List aligned with html_list holding processed content, or None where no content was found
+        """
+        results: List[Optional[str]] = [None] * len(html_list)
+        keys: List[Optional[str]] = [None] * len(html_list)
+        pending = []
+        for index, html_content in enumerate(html_list):
+            key, cached = self._html_cache_lookup(html_content, target_language)
+            keys[index] = key
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.append(index)
+        
+        # Documents needing chunk mode go through process_html_content, which chunks them and
+        # caches the result under the same key; packing would silently truncate them
+        single: List[int] = []
+        documents: Dict[int, str] = {}
+        for index in pending:
+            content = self._prepare_html(html_list[index])
+            if self._needs_chunking(content):
+                single.append(index)
+            else:
+                documents[index] = self._fit_input(content)
+        overhead = self._estimate_tokens(self._html_batch_prompt({}, target_language))
+        output_limit = max_output_tokens(self.model_name)
+        # Leave headroom for JSON escaping and translations running longer than their source
+        output_budget = int(output_limit * 0.8)
+        output_sizes = {index: int(self._estimate_tokens(text) * output_ratio) + 20
+                        for index, text in documents.items()}
+        single.extend(index for index in documents if output_sizes[index] > output_budget)
+        packable = {index: text for index, text in documents.items() if output_sizes[index] <= output_budget}
+        groups = self._pack_documents(packable, max_prompt_tokens - overhead, max_items_per_request,
+                                      output_sizes, output_budget)
+        logger.info(f"Packed {len(packable)} HTML documents into {len(groups)} request(s), "
+                    f"{len(single)} processed individually "
+                    f"({len(html_list) - len(pending)} served from cache)")
+        
+        for group in groups:
+            try:
+                response = self._generate(
+                    self._html_batch_prompt({index: documents[index] for index in group}, target_language),
+                    generation_config={'response_mime_type': 'application/json', 'max_output_tokens': output_limit},
+                    method='process_html_batch'
+                )
+            except Exception as e:
+                logger.error(f"HTML batch processing error: {str(e)}")
+                raise Exception(f"Failed to process HTML batch: {str(e)}")
+            
+            parsed = self._parse_html_batch_response(response)
+            for index in group:
+                if index in parsed:
+                    results[index] = self._cache_store(keys[index], parsed[index])
+                else:
+                    logger.warning(f"Document {index} missing from batch response, processing individually")
+                    single.append(index)
+        
+        for index in sorted(single):
+            results[index] = self.process_html_content(html_list[index], target_language)
+        
+        return results
+    
+    def _pack_documents(self, documents: Dict[int, str], token_budget: int, max_items: int,
+                        output_sizes: Optional[Dict[int, int]] = None,
+                        output_budget: Optional[int] = None) -> List[List[int]]:
+        """
+        Group documents into bins by estimated token count (first-fit decreasing)
+        
+        Args:
+            documents: Mapping of document index to text
+            token_budget: Input tokens per bin
+            max_items: Documents per bin
+            output_sizes: Optional expected output tokens per document, limited by output_budget per bin
+            output_budget: Output tokens per bin
+        
+        Returns:
+            List of groups of document indices, each group sorted by index
+        """
+        bins: List[List[int]] = []
+        loads: List[int] = []
+        outputs: List[int] = []
+        sizes = {index: self._estimate_tokens(text) + 20 for index, text in documents.items()}
+        expected = output_sizes or {}
+        for index in sorted(documents, key=lambda i: sizes[i], reverse=True):
+            output = expected.get(index, 0)
+            for b, load in enumerate(loads):
+                if (load + sizes[index] <= token_budget and len(bins[b]) < max_items
+                        and (output_budget is None or outputs[b] + output <= output_budget)):
+                    bins[b].append(index)
+                    loads[b] += sizes[index]
+                    outputs[b] += output
+                    break
+            else:
+                # Oversized documents still get a bin of their own
+                bins.append([index])
+                loads.append(sizes[index])
+                outputs.append(output)
+        return [sorted(group) for group in bins]
+    
+    def _html_batch_prompt(self, documents: Dict[int, str], target_language: str) -> str:
+        prompt = f"""
+            Extract and translate the main article content from each of the HTML documents below.
+            Each document starts with a line <<<DOCUMENT n>>> and ends with a line <<<END DOCUMENT n>>>.
             
-            response = self.model.generate_content(prompt + "\n\n" + html_content[:8000])  # Limit to prevent token overflow
+            Instructions:
+            1. Extract only the main article text, ignore navigation, ads, footers, headers
+            2. Translate the content to {target_language} if it's in another language
+            3. Clean up any HTML artifacts or formatting issues
+            4. Process every document independently
+            5. Return a JSON array with one object per document: {{"id": n, "content": "clean, translated article text"}}
+            6. If no meaningful content is found in a document, use null as its content
             
-            if response and response.text:
-                result = response.text.strip()
-                if "no article content" in result.lower() or "no meaningful content" in result.lower():
-                    return None
-                return result
+            Documents:
+            """
+        parts = [prompt]
+        for index, html_content in documents.items():
+            parts.append(f"<<<DOCUMENT {index}>>>\n{html_content}\n<<<END DOCUMENT {index}>>>")
+        return "\n\n".join(parts)
+    
+    def _parse_html_batch_response(self, response) -> Dict[int, Optional[str]]:
+        """
+        Split a packed response back into per-document results
+        
+        Returns:
+            Mapping of document index to content (None for no content). Documents the
+            response does not account for are left out
+        """
+        if not (response and response.text):
+            return {}
+        try:
+            entries = _load_json(response.text)
+        except ValueError:
+            entries = _load_json_entries(response.text)
+            logger.warning(f"Batch response is not valid JSON, kept {len(entries)} complete entries")
+        if isinstance(entries, dict):
+            entries = entries.get('documents') or entries.get('results') or []
+        
+        parsed = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                index = int(entry.get('id'))
+            except (TypeError, ValueError):
+                continue
+            content = entry.get('content')
+            if isinstance(content, str):
+                content = content.strip()
+                if not content or "no article content" in content.lower() or "no meaningful content" in content.lower():
+                    content = None
+            else:
+                content = None
+            parsed[index] = content
+        return parsed
+    
+    def embed_texts(self, texts: List[str], task_type: str = 'SEMANTIC_SIMILARITY',
+                    batch_size: int = 100) -> List[List[float]]:
+        """
+        Compute embedding vectors for texts, batching requests to the embedding model
+        
+        Args:
+            texts: Texts to embed; each is truncated to the embedding model's input limit
+            task_type: Embedding task type (default: SEMANTIC_SIMILARITY)
+            batch_size: Texts per embedding request (default: 100, the API maximum)
             
-            return None
+        Returns:
+            List of embedding vectors aligned with texts
+        """
+        try:
+            vectors: List[Optional[List[float]]] = [None] * len(texts)
+            keys: List[Optional[str]] = [None] * len(texts)
+            pending = []
+            for index, text in enumerate(texts):
+                keys[index], vectors[index] = self._cache_lookup('embed_texts', self.embedding_model, task_type, text)
+                if vectors[index] is None:
+                    pending.append(index)
             
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                contents = [self.token_counter.truncate(texts[index], self.EMBEDDING_INPUT_TOKENS) or " "
+                            for index in batch]
+                tokens = sum(self._estimate_tokens(content) for content in contents)
+                result = self._call(
+                    lambda: self.backend.embed(contents, self.embedding_model, task_type),
+                    tokens, method='embed_texts'
+                )
+                for index, vector in zip(batch, result):
+                    vectors[index] = self._cache_store(keys[index], list(vector))
+            
+            return vectors
         except Exception as e:
-            logger.error(f"HTML processing error: {str(e)}")
-            raise Exception(f"Failed to process HTML content: {str(e)}")
\ No newline at end of file
+            logger.error(f"Gemini embedding error: {str(e)}")
+            raise Exception(f"Failed to embed texts: {str(e)}")
+    
+    def _cache_lookup(self, method: str, *inputs: Any) -> Tuple[Optional[str], Optional[Any]]:
+        """
+        Look up a cached result for a method call
+        
+        Returns:
+            Tuple of (cache key, cached value). Both are None when caching is disabled,
+            the value is None on a miss
+        """
+        if self.cache is None:
+            return None, None
+        input_hash = make_cache_key(*inputs)
+        key = make_cache_key(method, self.model_name, self.PROMPT_VERSIONS[method], input_hash)
+        value = self.cache.get(key)
+        if self.metrics is not None:
+            self.metrics.record_cache(method, value is not None)
+        return key, value
+    
+    def _cache_store(self, key: Optional[str], result: Any) -> Any:
+        """Store a parsed result under key and return it unchanged"""
+        # None doubles as the error/no-content signal, so it is never cached
+        if key is not None and result is not None:
+            self.cache.set(key, result)
+        return result
+    
+    @staticmethod
+    def _estimate_tokens(prompt: str) -> int:
+        """Local token estimate used for rate limiting and request packing"""
+        return estimate_tokens(prompt) + 1
+    
+    def _count_model_tokens(self, text: str) -> int:
+        """Exact token count from the backend's count_tokens API, under the rate limiter and retry policy"""
+        if not self.backend.counts_tokens_remotely:
+            return self.backend.count_tokens(text)
+        # Counting consumes a request from the quota, not tokens
+        return self._call(lambda: self.backend.count_tokens(text), 0, 'count_tokens')
+    
+    def _generate(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                  method: str = 'generate'):
+        """Send a prompt to the model and return the raw response"""
+        return self._call(lambda: self.backend.generate(prompt, generation_config), self._estimate_tokens(prompt),
+                          method)
+    
+    async def _agenerate(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                         method: str = 'generate'):
+        """Send a prompt to the model without blocking the event loop"""
+        return await self._acall(lambda: self.backend.agenerate(prompt, generation_config),
+                                 self._estimate_tokens(prompt), method)
+    
+    def _call(self, func: Callable[[], Any], tokens: int, method: str = 'generate') -> Any:
+        """Run an API call under the rate limiter and retry policy, reporting it to metrics"""
+        state = {'queue': 0.0, 'retries': 0}
+        
+        def attempt():
+            # Every attempt, retries included, draws from the rate limit
+            if self.rate_limiter:
+                waiting = time.monotonic()
+                self.rate_limiter.acquire(tokens)
+                state['queue'] += time.monotonic() - waiting
+            return func()
+        
+        def on_retry(attempt_number: int, error: BaseException) -> None:
+            state['retries'] += 1
+        
+        started = time.monotonic()
+        response, error = None, None
+        try:
+            if self.retry_policy:
+                response = self.retry_policy.call(attempt, on_retry)
+            else:
+                response = attempt()
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_call(method, time.monotonic() - started, state['queue'], state['retries'],
+                                         response, error)
+    
+    async def _acall(self, func: Callable[[], Awaitable[Any]], tokens: int, method: str = 'generate') -> Any:
+        """Async version of _call for a zero-argument coroutine function"""
+        state = {'queue': 0.0, 'retries': 0}
+        
+        async def attempt():
+            if self.rate_limiter:
+                waiting = time.monotonic()
+                await self.rate_limiter.aacquire(tokens)
+                state['queue'] += time.monotonic() - waiting
+            return await func()
+        
+        def on_retry(attempt_number: int, error: BaseException) -> None:
+            state['retries'] += 1
+        
+        started = time.monotonic()
+        response, error = None, None
+        try:
+            if self.retry_policy:
+                response = await self.retry_policy.acall(attempt, on_retry)
+            else:
+                response = await attempt()
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_call(method, time.monotonic() - started, state['queue'], state['retries'],
+                                         response, error)
\ No newline at end of file
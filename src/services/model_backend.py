@@ -0,0 +1,279 @@
+"""
+Model backends for GeminiService
+A backend sends prompts, counts tokens and computes embeddings. The Gemini SDK is one
+implementation; HTTPBackend talks to any OpenAI- or Gemini-compatible HTTP endpoint
+(e.g. a local mock server) over pooled keep-alive connections
+"""
+import json
+import queue
+import asyncio
+import logging
+import threading
+import http.client
+from urllib.parse import urlsplit
+from typing import Any, Dict, List, Optional
+
+from ..utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class UsageMetadata:
+    """Token usage of a response, with the attribute names of the Gemini SDK"""
+
+    def __init__(self, prompt_token_count: Optional[int] = None, candidates_token_count: Optional[int] = None):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = (prompt_token_count or 0) + (candidates_token_count or 0)
+
+
+class ModelResponse:
+    """Minimal response object exposing .text and .usage_metadata like SDK responses"""
+
+    def __init__(self, text: str, usage_metadata: Optional[UsageMetadata] = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class ModelBackend:
+    """
+    Base class for model backends
+
+    generate/agenerate return an object with a .text attribute (and optionally
+    .usage_metadata); embed returns one vector per text.
+    """
+
+    model_name = 'model'
+
+    # True when count_tokens calls the API, so GeminiService rate-limits and retries it
+    counts_tokens_remotely = False
+
+    def generate(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Any:
+        raise NotImplementedError
+
+    async def agenerate(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Any:
+        # Backends without native async support run the blocking call in a thread
+        return await asyncio.to_thread(self.generate, prompt, generation_config)
+
+    def count_tokens(self, text: str) -> int:
+        return estimate_tokens(text)
+
+    def embed(self, texts: List[str], model: str, task_type: str) -> List[List[float]]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release connections held by the backend"""
+
+
+class GeminiBackend(ModelBackend):
+    """
+    Backend using the google-generativeai SDK
+
+    The SDK (and its grpc/protobuf stack) is imported and configured on the first call, so
+    creating a service for local-only work such as deduplication does not pay for it.
+    """
+
+    counts_tokens_remotely = True
+
+    def __init__(self, model_name: str = 'gemini-1.5-flash', api_key: Optional[str] = None):
+        """
+        Args:
+            model_name: Gemini model to use (default: gemini-1.5-flash)
+            api_key: Google Gemini API key, passed to genai.configure
+        """
+        self.model_name = model_name
+        self.api_key = api_key
+        self._genai = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=self.api_key)
+                self._genai = genai
+                self._model = genai.GenerativeModel(self.model_name)
+
+    @property
+    def model(self) -> Any:
+        """SDK GenerativeModel, created on first access"""
+        if self._model is None:
+            self._load()
+        return self._model
+
+    def generate(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Any:
+        kwargs = {'generation_config': generation_config} if generation_config else {}
+        return self.model.generate_content(prompt, **kwargs)
+
+    async def agenerate(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Any:
+        kwargs = {'generation_config': generation_config} if generation_config else {}
+        return await self.model.generate_content_async(prompt, **kwargs)
+
+    def count_tokens(self, text: str) -> int:
+        return self.model.count_tokens(text).total_tokens
+
+    def embed(self, texts: List[str], model: str, task_type: str) -> List[List[float]]:
+        if self._model is None:
+            self._load()
+        return self._genai.embed_content(model=model, content=texts, task_type=task_type)['embedding']
+
+
+class ModelHTTPError(Exception):
+    """
+    Non-success HTTP response from a model endpoint
+
+    Carries the status as .code and a Retry-After hint as .retry_after, which RetryPolicy reads.
+    """
+
+    def __init__(self, code: int, body: str, retry_after: Optional[str] = None):
+        super().__init__(f"HTTP {code}: {body[:200]}")
+        self.code = code
+        self.body = body
+        self.retry_after = retry_after
+
+
+class HTTPBackend(ModelBackend):
+    """
+    Backend for OpenAI- or Gemini-compatible HTTP APIs using pooled keep-alive connections
+
+    Connections are reused across requests (HTTP/1.1 keep-alive) from a pool of at most
+    pool_size, so concurrent workers do not pay a TCP/TLS handshake per call. Async calls
+    run the same pooled requests in threads.
+    """
+
+    API_STYLES = ('openai', 'gemini')
+
+    def __init__(self, base_url: str, model_name: str, api_key: Optional[str] = None,
+                 api_style: str = 'openai', pool_size: int = 16, timeout: float = 120.0,
+                 count_tokens_remotely: bool = False):
+        """
+        Args:
+            base_url: Endpoint root, e.g. http://localhost:8080 (paths /v1/... or /v1beta/... are appended)
+            model_name: Model name sent with every request
+            api_key: Sent as a Bearer token (openai) or x-goog-api-key header (gemini)
+            api_style: 'openai' (chat completions / embeddings) or 'gemini' (generateContent) (default: 'openai')
+            pool_size: Maximum number of idle connections kept open (default: 16)
+            timeout: Socket timeout in seconds (default: 120)
+            count_tokens_remotely: Use the gemini countTokens endpoint instead of the local estimate
+        """
+        if api_style not in self.API_STYLES:
+            raise ValueError("api_style must be 'openai' or 'gemini'")
+        url = urlsplit(base_url)
+        if url.scheme not in ('http', 'https'):
+            raise ValueError("base_url must start with http:// or https://")
+        self.base_url = base_url
+        self.model_name = model_name
+        self.api_key = api_key
+        self.api_style = api_style
+        self.timeout = timeout
+        self.counts_tokens_remotely = count_tokens_remotely and api_style == 'gemini'
+        self._scheme = url.scheme
+        self._host = url.hostname
+        self._port = url.port
+        self._prefix = url.path.rstrip('/')
+        self._pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=pool_size)
+
+    def _connection(self) -> http.client.HTTPConnection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            connection_class = http.client.HTTPSConnection if self._scheme == 'https' else http.client.HTTPConnection
+            return connection_class(self._host, self._port, timeout=self.timeout)
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        if self.api_key:
+            if self.api_style == 'openai':
+                headers['Authorization'] = f"Bearer {self.api_key}"
+            else:
+                headers['x-goog-api-key'] = self.api_key
+        return headers
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        body = json.dumps(payload).encode('utf-8')
+        # A pooled connection may have been closed by the server while idle; retry once on a fresh one
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request('POST', self._prefix + path, body=body, headers=self._headers())
+                response = connection.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                connection.close()
+                if attempt == 0:
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            if response.status >= 400:
+                raise ModelHTTPError(response.status, data.decode('utf-8', 'replace'),
+                                     response.getheader('Retry-After'))
+            return json.loads(data)
+        raise ConnectionError("Model endpoint closed the connection")
+
+    def generate(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> ModelResponse:
+        config = dict(generation_config or {})
+        if self.api_style == 'gemini':
+            payload: Dict[str, Any] = {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+            if config:
+                payload['generationConfig'] = {_camel_case(key): value for key, value in config.items()}
+            data = self._post(f"/v1beta/models/{self.model_name}:generateContent", payload)
+            candidates = data.get('candidates') or [{}]
+            parts = (candidates[0].get('content') or {}).get('parts') or []
+            usage = data.get('usageMetadata') or {}
+            return ModelResponse(''.join(part.get('text', '') for part in parts),
+                                 UsageMetadata(usage.get('promptTokenCount'), usage.get('candidatesTokenCount')))
+
+        payload = {'model': self.model_name, 'messages': [{'role': 'user', 'content': prompt}]}
+        if config.pop('response_mime_type', None) == 'application/json':
+            payload['response_format'] = {'type': 'json_object'}
+        for key, target in (('temperature', 'temperature'), ('max_output_tokens', 'max_tokens'), ('top_p', 'top_p')):
+            if key in config:
+                payload[target] = config[key]
+        data = self._post('/v1/chat/completions', payload)
+        choices = data.get('choices') or [{}]
+        usage = data.get('usage') or {}
+        return ModelResponse((choices[0].get('message') or {}).get('content') or '',
+                             UsageMetadata(usage.get('prompt_tokens'), usage.get('completion_tokens')))
+
+    def count_tokens(self, text: str) -> int:
+        if self.counts_tokens_remotely:
+            data = self._post(f"/v1beta/models/{self.model_name}:countTokens",
+                              {'contents': [{'parts': [{'text': text}]}]})
+            return int(data['totalTokens'])
+        return estimate_tokens(text)
+
+    def embed(self, texts: List[str], model: str, task_type: str) -> List[List[float]]:
+        if self.api_style == 'gemini':
+            name = model if model.startswith('models/') else f"models/{model}"
+            data = self._post(f"/v1beta/{name}:batchEmbedContents", {'requests': [
+                {'model': name, 'content': {'parts': [{'text': text}]}, 'taskType': task_type} for text in texts
+            ]})
+            return [embedding['values'] for embedding in data['embeddings']]
+        data = self._post('/v1/embeddings', {'model': model.split('/')[-1], 'input': texts})
+        return [entry['embedding'] for entry in sorted(data['data'], key=lambda entry: entry.get('index', 0))]
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def _camel_case(name: str) -> str:
+    head, *rest = name.split('_')
+    return head + ''.join(part.title() for part in rest)
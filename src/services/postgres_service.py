@@ -0,0 +1,356 @@
+"""
+PostgreSQL service for reading batch inputs and writing processing results
+Buffers result rows and writes them in bulk instead of one UPDATE and commit per item
+"""
+import io
+import os
+import time
+import hashlib
+import uuid
+import logging
+import threading
+import psycopg2
+from psycopg2 import pool, sql
+from psycopg2.extras import RealDictCursor, execute_values
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def connection_pool_from_env(minconn: int = 1, maxconn: int = 4) -> pool.ThreadedConnectionPool:
+    """
+    Create a thread-safe connection pool from DATABASE_URL or the DB_* environment variables
+
+    Args:
+        minconn: Connections opened up front (default: 1)
+        maxconn: Maximum pooled connections (default: 4)
+
+    Returns:
+        psycopg2 ThreadedConnectionPool
+    """
+    dsn = os.getenv('DATABASE_URL')
+    if dsn:
+        return pool.ThreadedConnectionPool(minconn, maxconn, dsn)
+
+    if not os.getenv('DB_NAME'):
+        raise ValueError("Database not configured. Set DATABASE_URL or DB_HOST, DB_PORT, DB_NAME, DB_USER and DB_PASSWORD")
+
+    return pool.ThreadedConnectionPool(
+        minconn, maxconn,
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', '5432')),
+        dbname=os.getenv('DB_NAME'),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD'),
+    )
+
+
+class PostgresSource:
+    """
+    Lazy item source reading from PostgreSQL through a named (server-side) cursor
+
+    Rows are fetched itersize at a time, so iterating over millions of rows keeps only
+    one page in memory. Iterating yields plain dicts that can be passed straight to
+    process_batch or process_stream.
+    """
+
+    def __init__(self,
+                 table: Optional[str] = None,
+                 connection_pool: Optional[pool.AbstractConnectionPool] = None,
+                 columns: Sequence[str] = ('id', 'content', 'title'),
+                 pending_column: Optional[str] = None,
+                 where: Optional[str] = None,
+                 params: Optional[Sequence[Any]] = None,
+                 order_by: Optional[str] = 'id',
+                 query: Optional[str] = None,
+                 itersize: int = 2000):
+        """
+        Args:
+            table: Source table name (optionally schema-qualified). Required unless query is given
+            connection_pool: psycopg2 connection pool. If None, one is created from the environment
+            columns: Columns to select; select only what processing needs (default: id, content, title)
+            pending_column: If set, only rows where this column IS NULL are read, i.e. rows whose
+                result has not been written yet
+            where: Extra SQL condition with %s placeholders, combined with AND
+            params: Parameters for the where placeholders
+            order_by: Column to order by for a stable, resumable read order (default: 'id'; None for no order)
+            query: Complete SELECT statement overriding table, columns, pending_column, where and order_by
+            itersize: Rows fetched per network round trip (default: 2000)
+        """
+        if not table and not query:
+            raise ValueError("Either table or query must be provided")
+
+        self.table = table
+        self.pool = connection_pool or connection_pool_from_env()
+        self.columns = list(columns)
+        self.pending_column = pending_column
+        self.where = where
+        self.params = list(params) if params else []
+        self.order_by = order_by
+        self.query = query
+        self.itersize = itersize
+
+    def _select(self):
+        if self.query:
+            return sql.SQL(self.query)
+
+        conditions = []
+        if self.pending_column:
+            conditions.append(sql.SQL('{col} IS NULL').format(col=sql.Identifier(self.pending_column)))
+        if self.where:
+            conditions.append(sql.SQL('(') + sql.SQL(self.where) + sql.SQL(')'))
+
+        statement = sql.SQL('SELECT {columns} FROM {table}').format(
+            columns=sql.SQL(', ').join(map(sql.Identifier, self.columns)),
+            table=sql.Identifier(*self.table.split('.')),
+        )
+        if conditions:
+            statement += sql.SQL(' WHERE ') + sql.SQL(' AND ').join(conditions)
+        if self.order_by:
+            statement += sql.SQL(' ORDER BY {col}').format(col=sql.Identifier(self.order_by))
+        return statement
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        conn = self.pool.getconn()
+        try:
+            # A named cursor lives on the server; psycopg2 fetches itersize rows per round trip
+            with conn.cursor(name=f"destiny_source_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cursor:
+                cursor.itersize = self.itersize
+                cursor.execute(self._select(), self.params or None)
+                for row in cursor:
+                    yield dict(row)
+        finally:
+            # End the read transaction before handing the connection back
+            conn.rollback()
+            self.pool.putconn(conn)
+
+    def count(self) -> int:
+        """Return the number of rows the source would yield"""
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL('SELECT COUNT(*) FROM ({select}) AS source').format(select=self._select()),
+                               self.params or None)
+                return cursor.fetchone()[0]
+        finally:
+            conn.rollback()
+            self.pool.putconn(conn)
+
+
+def _csv_field(value: Any) -> str:
+    """
+    Encode one value for COPY ... (FORMAT csv)
+
+    NULL is written as an unquoted empty field and every other value is quoted, so no
+    text, not even an empty string or a literal \\N, can be read back as NULL
+    """
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class PostgresSink:
+    """
+    Buffered bulk writer for process_batch results
+
+    An instance is a drop-in update_callback: each call buffers one row and every
+    batch_size rows (or flush_interval seconds) the buffer is written in a single
+    transaction. Rows stay buffered until their transaction commits, so a failed
+    flush is retried on the next one (at-least-once delivery).
+    """
+
+    def __init__(self,
+                 table: str,
+                 connection_pool: Optional[pool.AbstractConnectionPool] = None,
+                 id_column: str = 'id',
+                 content_column: str = 'content',
+                 error_column: Optional[str] = 'processing_error',
+                 mode: str = 'update',
+                 batch_size: int = 500,
+                 flush_interval: float = 5.0):
+        """
+        Args:
+            table: Target table name (optionally schema-qualified, e.g. 'public.articles')
+            connection_pool: psycopg2 connection pool. If None, one is created from the environment
+            id_column: Column matched against the item id (default: 'id')
+            content_column: Column receiving processed content (default: 'content')
+            error_column: Column receiving error messages. If None, errors are not written
+            mode: 'update' stages rows with COPY into a temporary table and updates existing rows
+                in one statement; 'upsert' inserts with execute_values and ON CONFLICT (default: 'update')
+            batch_size: Rows per flush (default: 500)
+            flush_interval: Maximum seconds rows wait in the buffer while calls keep arriving (default: 5.0)
+        """
+        if mode not in ('update', 'upsert'):
+            raise ValueError("mode must be 'update' or 'upsert'")
+
+        self.table = table
+        self.pool = connection_pool or connection_pool_from_env()
+        self.id_column = id_column
+        self.content_column = content_column
+        self.error_column = error_column
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Temp tables live per connection, and pooled connections are shared by sinks;
+        # naming the staging table after the target and its columns keeps shapes apart
+        signature = '\x00'.join([table] + self._columns()).encode('utf-8')
+        self._staging = f"destiny_sink_staging_{hashlib.sha1(signature).hexdigest()[:16]}"
+
+        self.rows_written = 0
+        self.flushes = 0
+        self.flush_seconds = 0.0
+        self.flush_failures = 0
+        self.last_error: Optional[str] = None
+
+        # Keyed by item id so a batch never touches the same row twice
+        self._buffer: Dict[Any, Tuple[Optional[str], Optional[str]]] = {}
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def __call__(self, item_id: Any, content: str, is_error: bool) -> bool:
+        """
+        Buffer one result, following the process_batch update_callback contract
+
+        Returns:
+            True once the row is buffered. Write failures are logged and retried on the next flush
+        """
+        if is_error and self.error_column is None:
+            return True
+        row = (None, content) if is_error else (content, None)
+        with self._buffer_lock:
+            self._buffer[item_id] = row
+            due = len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"PostgreSQL flush failed, rows kept for retry: {str(e)}")
+        return True
+
+    def flush(self) -> int:
+        """
+        Write every buffered row in one transaction
+
+        Returns:
+            Number of rows written
+
+        Raises:
+            Exception if the write fails; the rows are put back into the buffer
+        """
+        with self._flush_lock:
+            with self._buffer_lock:
+                rows, self._buffer = self._buffer, {}
+                self._last_flush = time.monotonic()
+            if not rows:
+                return 0
+
+            started = time.perf_counter()
+            conn = self.pool.getconn()
+            try:
+                with conn.cursor() as cursor:
+                    if self.mode == 'update':
+                        self._copy_update(cursor, rows)
+                    else:
+                        self._upsert(cursor, rows)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                self.flush_failures += 1
+                self.last_error = str(e)
+                with self._buffer_lock:
+                    # Newer results that arrived meanwhile win over the failed batch
+                    rows.update(self._buffer)
+                    self._buffer = rows
+                raise
+            finally:
+                self.pool.putconn(conn)
+
+            elapsed = time.perf_counter() - started
+            self.rows_written += len(rows)
+            self.flushes += 1
+            self.flush_seconds += elapsed
+            logger.info(f"Wrote {len(rows)} rows to {self.table} in {elapsed:.3f}s")
+            return len(rows)
+
+    def close(self) -> None:
+        """Flush remaining rows"""
+        self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        """Return write counters and throughput in rows per second of database time"""
+        return {
+            'rows_written': self.rows_written,
+            'flushes': self.flushes,
+            'flush_seconds': round(self.flush_seconds, 3),
+            'rows_per_second': round(self.rows_written / self.flush_seconds, 1) if self.flush_seconds else 0.0,
+            'flush_failures': self.flush_failures,
+            'buffered': len(self._buffer),
+        }
+
+    def _table_identifier(self) -> sql.Identifier:
+        return sql.Identifier(*self.table.split('.'))
+
+    def _columns(self) -> List[str]:
+        columns = [self.id_column, self.content_column]
+        if self.error_column:
+            columns.append(self.error_column)
+        return columns
+
+    def _rows(self, rows: Dict[Any, Tuple[Optional[str], Optional[str]]]) -> List[tuple]:
+        if self.error_column:
+            return [(item_id, content, error) for item_id, (content, error) in rows.items()]
+        return [(item_id, content) for item_id, (content, _) in rows.items()]
+
+    def _copy_update(self, cursor, rows: Dict[Any, Tuple[Optional[str], Optional[str]]]) -> None:
+        """Stage rows with COPY and apply them with a single UPDATE ... FROM"""
+        columns = self._columns()
+        staging = sql.Identifier(self._staging)
+        # Cloning the column types keeps the join on the id index
+        cursor.execute(sql.SQL(
+            'CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DELETE ROWS AS '
+            'SELECT {columns} FROM {table} WITH NO DATA'
+        ).format(
+            staging=staging,
+            columns=sql.SQL(', ').join(map(sql.Identifier, columns)),
+            table=self._table_identifier(),
+        ))
+
+        data = io.StringIO()
+        for row in self._rows(rows):
+            data.write(','.join(_csv_field(value) for value in row))
+            data.write('\n')
+        data.seek(0)
+        cursor.copy_expert(sql.SQL("COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)").format(
+            staging=staging,
+            columns=sql.SQL(', ').join(map(sql.Identifier, columns)),
+        ), data)
+
+        # Error rows carry no content, so keep whatever content the row already has
+        assignments = [sql.SQL('{col} = COALESCE(s.{col}, t.{col})').format(col=sql.Identifier(self.content_column))]
+        if self.error_column:
+            assignments.append(sql.SQL('{col} = s.{col}').format(col=sql.Identifier(self.error_column)))
+        cursor.execute(sql.SQL(
+            'UPDATE {table} AS t SET {assignments} FROM {staging} AS s WHERE t.{id} = s.{id}'
+        ).format(
+            table=self._table_identifier(),
+            assignments=sql.SQL(', ').join(assignments),
+            staging=staging,
+            id=sql.Identifier(self.id_column),
+        ))
+
+    def _upsert(self, cursor, rows: Dict[Any, Tuple[Optional[str], Optional[str]]]) -> None:
+        """Insert rows in pages with execute_values, updating rows that already exist"""
+        columns = self._columns()
+        assignments = [sql.SQL('{col} = COALESCE(EXCLUDED.{col}, t.{col})').format(col=sql.Identifier(self.content_column))]
+        if self.error_column:
+            assignments.append(sql.SQL('{col} = EXCLUDED.{col}').format(col=sql.Identifier(self.error_column)))
+        query = sql.SQL(
+            'INSERT INTO {table} AS t ({columns}) VALUES %s ON CONFLICT ({id}) DO UPDATE SET {assignments}'
+        ).format(
+            table=self._table_identifier(),
+            columns=sql.SQL(', ').join(map(sql.Identifier, columns)),
+            id=sql.Identifier(self.id_column),
+            assignments=sql.SQL(', ').join(assignments),
+        )
+        execute_values(cursor, query.as_string(cursor), self._rows(rows), page_size=self.batch_size)
@@ -0,0 +1,109 @@
+"""
+Blocking for duplicate detection
+Restricts pairing to items that share metadata (e.g. language, category) and were
+published within a time window of each other, using a sorted sweep per block
+"""
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+def to_timestamp(value: Any) -> Optional[float]:
+    """
+    Convert a date value to POSIX seconds
+
+    Accepts datetime/date objects, numbers (already POSIX seconds) and ISO 8601 strings.
+    Naive datetimes are taken as UTC.
+
+    Returns:
+        Timestamp, or None if the value is missing or unparseable
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return None
+
+
+class Blocking:
+    """
+    Pairs only items in the same block: equal values of every same_fields entry and,
+    when date_field is set, dates at most window_days apart
+
+    Items whose date is missing or unparseable are paired with every item of their
+    metadata block, so they are never silently excluded.
+    """
+
+    def __init__(self, date_field: Optional[str] = None, window_days: float = 3.0,
+                 same_fields: Sequence[str] = ()):
+        """
+        Args:
+            date_field: Field holding the publication date. None disables the time window
+            window_days: Maximum distance in days between paired items (default: 3.0)
+            same_fields: Fields that must be equal for two items to be paired,
+                e.g. ('language', 'category')
+        """
+        self.date_field = date_field
+        self.window_seconds = window_days * 86400.0
+        self.same_fields = tuple(same_fields)
+        self._keys: List[Tuple] = []
+        self._times: List[Optional[float]] = []
+
+    def prepare(self, items: List[Dict[str, Any]]) -> None:
+        """Compute the block key and timestamp of every item"""
+        self._keys = [tuple(item.get(field) for field in self.same_fields) for item in items]
+        if self.date_field is None:
+            self._times = [None] * len(items)
+        else:
+            self._times = [to_timestamp(item.get(self.date_field)) for item in items]
+
+    def allows(self, i: int, j: int) -> bool:
+        """Return True if items i and j fall into a common block"""
+        if self._keys[i] != self._keys[j]:
+            return False
+        if self.date_field is None:
+            return True
+        t1, t2 = self._times[i], self._times[j]
+        return t1 is None or t2 is None or abs(t1 - t2) <= self.window_seconds
+
+    def pairs(self) -> Iterator[Tuple[int, int]]:
+        """
+        Yield every allowed (i, j) index pair with i < j
+
+        Within a metadata block items are sorted by date and swept with a moving window,
+        so the number of pairs follows the window density rather than the corpus size.
+        """
+        blocks: Dict[Tuple, List[int]] = {}
+        for index, key in enumerate(self._keys):
+            blocks.setdefault(key, []).append(index)
+
+        for members in blocks.values():
+            dated = sorted((i for i in members if self._times[i] is not None), key=lambda i: self._times[i])
+            undated = [i for i in members if self._times[i] is None]
+
+            for start, i in enumerate(dated):
+                limit = self._times[i] + self.window_seconds
+                for position in range(start + 1, len(dated)):
+                    j = dated[position]
+                    if self._times[j] > limit:
+                        break
+                    yield (i, j) if i < j else (j, i)
+            for start, i in enumerate(undated):
+                for position in range(start + 1, len(undated)):
+                    j = undated[position]
+                    yield (i, j) if i < j else (j, i)
+                for j in dated:
+                    yield (i, j) if i < j else (j, i)
+
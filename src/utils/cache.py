@@ -0,0 +1,217 @@
+"""
+Response caches for AI service calls
+In-memory LRU and on-disk SQLite backends sharing a small get/set interface
+"""
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def make_cache_key(*parts: Any) -> str:
+    """
+    Build a content-addressed cache key from arbitrary parts
+
+    Args:
+        parts: Values identifying the call (method, model, prompt version, inputs...)
+
+    Returns:
+        Hex SHA-256 digest of the parts
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Base class for response caches
+
+    Values must be JSON-serializable. None is treated as "not cached",
+    so backends never store it.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        """
+        Args:
+            ttl: Seconds an entry stays valid. If None, entries never expire
+            max_entries: Maximum number of entries kept. If None, size is unbounded
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss"""
+        value = self._get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value under key. None values are ignored"""
+        if value is None:
+            return
+        self._set(key, value)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self)}
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryCache(ResponseCache):
+    """In-process LRU cache with optional TTL"""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = 10000):
+        super().__init__(ttl=ttl, max_entries=max_entries)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._entries_lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._entries_lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if self._expired(created):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Any) -> None:
+        with self._entries_lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            if self.max_entries is not None:
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._entries_lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._entries_lock:
+            return len(self._entries)
+
+
+class SQLiteCache(ResponseCache):
+    """
+    On-disk cache backed by a SQLite file, evicting least recently used entries
+
+    Eviction runs in batches once the entry count exceeds max_entries by a tenth, so the
+    file may briefly hold up to 10% more entries. Access times of hits are buffered and
+    written together, keeping lookups read-only.
+    """
+
+    # Buffered access-time updates written in one statement
+    TOUCH_BATCH = 256
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        """
+        Args:
+            path: Path of the SQLite database file
+            ttl: Seconds an entry stays valid. If None, entries never expire
+            max_entries: Maximum number of entries kept. If None, size is unbounded
+        """
+        super().__init__(ttl=ttl, max_entries=max_entries)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+        self._db_lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        # Upper bound of the entry count: replacing a key or another process evicting only lowers it
+        self._count = self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        self._slack = max(1, max_entries // 10) if max_entries is not None else 0
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._db_lock:
+            row = self._conn.execute('SELECT value, created FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self._expired(created):
+                self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                self._touched.pop(key, None)
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self._flush_touched()
+        return json.loads(value)
+
+    def _set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._db_lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), now, now)
+            )
+            self._touched.pop(key, None)
+            self._count += 1
+            if self.max_entries is not None and self._count > self.max_entries + self._slack:
+                self._evict()
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self._conn.executemany('UPDATE cache SET accessed = ? WHERE key = ?',
+                                   [(accessed, key) for key, accessed in self._touched.items()])
+            self._touched = {}
+
+    def _evict(self) -> None:
+        """Delete the least recently used entries down to max_entries in one statement"""
+        self._flush_touched()
+        self._count = self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        excess = self._count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)', (excess,)
+            )
+            self._count = self.max_entries
+
+    def clear(self) -> None:
+        with self._db_lock:
+            self._conn.execute('DELETE FROM cache')
+            self._touched = {}
+            self._count = 0
+
+    def close(self) -> None:
+        """Write buffered access times and close the underlying database connection"""
+        with self._db_lock:
+            self._flush_touched()
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._db_lock:
+            return self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
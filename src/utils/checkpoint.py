@@ -0,0 +1,216 @@
+"""
+Checkpoint stores for resumable batch runs
+Record which items finished so a restarted run can skip them. Writes are batched
+and synced periodically so journaling does not slow processing down.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Statuses treated as finished on resume; failed items are retried unless skip_failed is set
+DONE_STATUSES = frozenset({'processed', 'skipped'})
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(content: Any) -> str:
+    """Return a short stable hash of item content, so changed items are reprocessed"""
+    return hashlib.blake2b(str(content).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CheckpointStore:
+    """Base class for checkpoint stores"""
+
+    def __init__(self, skip_failed: bool = False, sync_every: int = 500, sync_interval: float = 5.0,
+                 before_sync: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            skip_failed: Also skip items that failed in a previous run (default: False, retry them)
+            sync_every: Records buffered before they are made durable (default: 500)
+            sync_interval: Maximum seconds between syncs while records are pending (default: 5.0)
+            before_sync: Called before every sync, e.g. a buffered sink's flush. If it raises,
+                the sync is abandoned so no item is checkpointed ahead of its output
+        """
+        self.skip_failed = skip_failed
+        self.before_sync = before_sync
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def should_skip(self, item_id: Any, digest: str) -> bool:
+        """Return True if the item with this content hash already finished in an earlier run"""
+        status = self._status(str(item_id), digest)
+        if status is None:
+            return False
+        return status in DONE_STATUSES or (self.skip_failed and status == 'failed')
+
+    def record(self, item_id: Any, digest: str, status: str) -> None:
+        """Record the outcome of an item, syncing to disk when the batch threshold is reached"""
+        with self._lock:
+            self._write(str(item_id), digest, status)
+            self._pending += 1
+            if self._pending >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                try:
+                    self._sync()
+                except Exception as e:
+                    # Records stay pending and are synced on the next attempt
+                    logger.error(f"Checkpoint sync failed: {str(e)}")
+
+    def flush(self) -> None:
+        """Make every recorded outcome durable"""
+        with self._lock:
+            self._sync()
+
+    def _sync(self) -> None:
+        if self.before_sync is not None:
+            self.before_sync()
+        self._commit()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """Flush and release the underlying storage"""
+        raise NotImplementedError
+
+    def _status(self, item_id: str, digest: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _write(self, item_id: str, digest: str, status: str) -> None:
+        raise NotImplementedError
+
+    def _commit(self) -> None:
+        raise NotImplementedError
+
+    def __enter__(self) -> 'CheckpointStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """
+    Checkpoint store in a SQLite file, queried per item so memory stays flat
+
+    Records are buffered in memory and written in one short transaction per sync, so
+    several processes can share one store (WAL mode) without holding the write lock
+    between syncs.
+    """
+
+    def __init__(self, path: str, skip_failed: bool = False, sync_every: int = 500, sync_interval: float = 5.0,
+                 before_sync: Optional[Callable[[], Any]] = None, timeout: float = 30.0):
+        """
+        Args:
+            path: Path of the SQLite database file
+            skip_failed: Also skip items that failed in a previous run (default: False)
+            sync_every: Records per transaction (default: 500)
+            sync_interval: Maximum seconds records stay buffered (default: 5.0)
+            before_sync: Called before every commit (see CheckpointStore)
+            timeout: Seconds to wait for another process's write lock (default: 30)
+        """
+        super().__init__(skip_failed, sync_every, sync_interval, before_sync)
+        self.path = path
+        self._buffer: Dict[str, Tuple[str, str, float]] = {}
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS checkpoints ('
+            'item_id TEXT PRIMARY KEY, digest TEXT NOT NULL, status TEXT NOT NULL, updated REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    def _status(self, item_id: str, digest: str) -> Optional[str]:
+        with self._lock:
+            buffered = self._buffer.get(item_id)
+            if buffered is not None:
+                return buffered[1] if buffered[0] == digest else None
+            row = self._conn.execute(
+                'SELECT status FROM checkpoints WHERE item_id = ? AND digest = ?', (item_id, digest)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _write(self, item_id: str, digest: str, status: str) -> None:
+        self._buffer[item_id] = (digest, status, time.time())
+
+    def _commit(self) -> None:
+        if not self._buffer:
+            return
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO checkpoints (item_id, digest, status, updated) VALUES (?, ?, ?, ?)',
+                [(item_id, digest, status, updated) for item_id, (digest, status, updated) in self._buffer.items()]
+            )
+        self._buffer = {}
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of recorded (synced) items per status"""
+        with self._lock:
+            return dict(self._conn.execute('SELECT status, COUNT(*) FROM checkpoints GROUP BY status'))
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._sync()
+            finally:
+                self._conn.close()
+
+
+class JSONLCheckpointStore(CheckpointStore):
+    """
+    Append-only JSON Lines journal. The journal is replayed into memory on open,
+    later lines overriding earlier ones for the same item
+    """
+
+    def __init__(self, path: str, skip_failed: bool = False, sync_every: int = 500, sync_interval: float = 5.0,
+                 before_sync: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            path: Path of the journal file
+            skip_failed: Also skip items that failed in a previous run (default: False)
+            sync_every: Records written between fsyncs (default: 500)
+            sync_interval: Maximum seconds between fsyncs (default: 5.0)
+            before_sync: Called before every fsync (see CheckpointStore)
+        """
+        super().__init__(skip_failed, sync_every, sync_interval, before_sync)
+        self.path = path
+        self._entries: Dict[str, Tuple[str, str]] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                        self._entries[entry['id']] = (entry['digest'], entry['status'])
+                    except (ValueError, KeyError, TypeError):
+                        # A torn last line from a crash is expected; ignore it
+                        continue
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _status(self, item_id: str, digest: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(item_id)
+        if entry and entry[0] == digest:
+            return entry[1]
+        return None
+
+    def _write(self, item_id: str, digest: str, status: str) -> None:
+        self._entries[item_id] = (digest, status)
+        self._file.write(json.dumps({'id': item_id, 'digest': digest, 'status': status}) + '\n')
+
+    def _commit(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._sync()
+            finally:
+                self._file.close()
@@ -0,0 +1,280 @@
+"""
+Cascaded duplicate detection
+Pairs pass through stages ordered from cheapest to most expensive; each stage accepts
+the pair as duplicate, rejects it, or escalates it to the next stage
+"""
+import re
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .minhash import MinHasher, estimate_jaccard, shingles
+
+logger = logging.getLogger(__name__)
+
+ACCEPT = 'accept'
+REJECT = 'reject'
+ESCALATE = 'escalate'
+
+_NON_WORD = re.compile(r'\W+', re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse punctuation and whitespace to single spaces"""
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+
+def simhash(text: str, bits: int = 64) -> int:
+    """
+    Compute a SimHash fingerprint over the word counts of text
+
+    Similar texts get fingerprints with a small Hamming distance.
+    """
+    vector = [0] * bits
+    for word, weight in Counter(normalize_text(text).split()).items():
+        h = int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=bits // 8).digest(), 'big')
+        for bit in range(bits):
+            vector[bit] += weight if (h >> bit) & 1 else -weight
+    fingerprint = 0
+    for bit in range(bits):
+        if vector[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints"""
+    return bin(a ^ b).count('1')
+
+
+def _joined(documents: List[Tuple[str, str]]) -> List[str]:
+    return [f"{title}\n{content}" for title, content in documents]
+
+
+def _empty(texts: List[str]) -> List[bool]:
+    # Items without any words all share one hash, fingerprint and signature; they are not duplicates
+    return [not normalize_text(text) for text in texts]
+
+
+class CascadeStage:
+    """
+    Base class for cascade stages
+
+    prepare() receives the (title, content) of every item once, so per-item features are
+    computed a single time; decide() then judges a pair of item indices.
+    """
+
+    name = 'stage'
+
+    def prepare(self, documents: List[Tuple[str, str]]) -> None:
+        self.documents = documents
+
+    def decide(self, i: int, j: int) -> str:
+        raise NotImplementedError
+
+
+class ExactHashStage(CascadeStage):
+    """Accepts pairs whose normalized texts are identical; rejects pairs with an empty text"""
+
+    name = 'exact_hash'
+
+    def prepare(self, documents: List[Tuple[str, str]]) -> None:
+        texts = _joined(documents)
+        self.empty = _empty(texts)
+        self.digests = [
+            hashlib.blake2b(normalize_text(t).encode('utf-8'), digest_size=16).digest() for t in texts
+        ]
+
+    def decide(self, i: int, j: int) -> str:
+        if self.empty[i] or self.empty[j]:
+            return REJECT
+        return ACCEPT if self.digests[i] == self.digests[j] else ESCALATE
+
+
+class SimHashStage(CascadeStage):
+    """Accepts close SimHash fingerprints and rejects distant ones"""
+
+    name = 'simhash'
+
+    def __init__(self, accept_distance: int = 3, reject_distance: Optional[int] = 24):
+        """
+        Args:
+            accept_distance: Hamming distance at or below which a pair is accepted (default: 3)
+            reject_distance: Hamming distance at or above which a pair is rejected (default: 24;
+                unrelated texts sit around 32). None never rejects
+        """
+        self.accept_distance = accept_distance
+        self.reject_distance = reject_distance
+
+    def prepare(self, documents: List[Tuple[str, str]]) -> None:
+        texts = _joined(documents)
+        self.empty = _empty(texts)
+        self.fingerprints = [simhash(t) for t in texts]
+
+    def decide(self, i: int, j: int) -> str:
+        if self.empty[i] or self.empty[j]:
+            return REJECT
+        distance = hamming_distance(self.fingerprints[i], self.fingerprints[j])
+        if distance <= self.accept_distance:
+            return ACCEPT
+        if self.reject_distance is not None and distance >= self.reject_distance:
+            return REJECT
+        return ESCALATE
+
+
+class JaccardStage(CascadeStage):
+    """Judges pairs by MinHash-estimated Jaccard similarity of word shingles"""
+
+    name = 'jaccard'
+
+    def __init__(self, accept_above: float = 0.9, reject_below: Optional[float] = 0.05, num_perm: int = 128):
+        """
+        Args:
+            accept_above: Estimated Jaccard at or above which a pair is accepted (default: 0.9)
+            reject_below: Estimated Jaccard below which a pair is rejected (default: 0.05).
+                Translations share few shingles, so keep this low or None if they matter
+            num_perm: MinHash signature length (default: 128)
+        """
+        self.accept_above = accept_above
+        self.reject_below = reject_below
+        self.hasher = MinHasher(num_perm=num_perm)
+
+    def prepare(self, documents: List[Tuple[str, str]]) -> None:
+        texts = _joined(documents)
+        self.empty = _empty(texts)
+        self.signatures = [self.hasher.signature(shingles(t)) for t in texts]
+
+    def decide(self, i: int, j: int) -> str:
+        if self.empty[i] or self.empty[j]:
+            return REJECT
+        similarity = estimate_jaccard(self.signatures[i], self.signatures[j])
+        if similarity >= self.accept_above:
+            return ACCEPT
+        if self.reject_below is not None and similarity < self.reject_below:
+            return REJECT
+        return ESCALATE
+
+
+class EmbeddingStage(CascadeStage):
+    """
+    Judges pairs by cosine similarity of embeddings. Embeddings for all items are
+    fetched in one batched pass the first time a pair reaches this stage. If that pass
+    fails, it is not retried per pair: every pair is escalated to the next stage
+    """
+
+    name = 'embedding'
+
+    def __init__(self, embed_func: Callable[[List[str]], List[List[float]]],
+                 accept_above: float = 0.95, reject_below: Optional[float] = 0.75):
+        """
+        Args:
+            embed_func: Function returning an embedding per text (e.g. GeminiService.embed_texts)
+            accept_above: Cosine similarity at or above which a pair is accepted (default: 0.95)
+            reject_below: Cosine similarity below which a pair is rejected (default: 0.75)
+        """
+        self.embed_func = embed_func
+        self.accept_above = accept_above
+        self.reject_below = reject_below
+        self._vectors = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def prepare(self, documents: List[Tuple[str, str]]) -> None:
+        self.texts = _joined(documents)
+        self.empty = _empty(self.texts)
+        self._vectors = None
+        self._failed = False
+
+    def _ensure_vectors(self):
+        """Return the normalized embeddings, or None if embedding the corpus failed"""
+        with self._lock:
+            if self._vectors is None and not self._failed:
+                try:
+                    from .vector_index import normalize
+                    self._vectors = normalize(self.embed_func(self.texts))
+                except Exception as e:
+                    self._failed = True
+                    logger.error(f"Embedding {len(self.texts)} items failed, escalating all pairs: {str(e)}")
+        return self._vectors
+
+    def decide(self, i: int, j: int) -> str:
+        if self.empty[i] or self.empty[j]:
+            return REJECT
+        vectors = self._ensure_vectors()
+        if vectors is None:
+            return ESCALATE
+        similarity = float(vectors[i] @ vectors[j])
+        if similarity >= self.accept_above:
+            return ACCEPT
+        if self.reject_below is not None and similarity < self.reject_below:
+            return REJECT
+        return ESCALATE
+
+
+class ModelStage(CascadeStage):
+    """Final verdict from the generative model; never escalates"""
+
+    name = 'model'
+
+    def __init__(self, compare_func: Callable[[str, str, str, str], Optional[bool]]):
+        """
+        Args:
+            compare_func: Function with the signature of detect_content_similarity
+                (content1, content2, title1, title2) returning True for duplicates,
+                False for different items and None when the model gave no verdict
+        """
+        self.compare_func = compare_func
+
+    def decide(self, i: int, j: int) -> str:
+        (title1, content1), (title2, content2) = self.documents[i], self.documents[j]
+        return ACCEPT if self.compare_func(content1, content2, title1, title2) is True else REJECT
+
+
+class DuplicateCascade:
+    """Runs pairs through stages in order, counting each stage's decisions"""
+
+    def __init__(self, stages: Sequence[CascadeStage]):
+        """
+        Args:
+            stages: Stages ordered from cheapest to most expensive
+        """
+        self.stages = list(stages)
+        self._counts = {stage.name: Counter() for stage in self.stages}
+        self._unresolved = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, documents: List[Tuple[str, str]]) -> None:
+        """Compute per-item features for every stage from (title, content) pairs"""
+        for stage in self.stages:
+            stage.prepare(documents)
+
+    def decide(self, i: int, j: int) -> Tuple[bool, Optional[str]]:
+        """
+        Judge a pair of item indices
+
+        Returns:
+            Tuple of (is duplicate, name of the deciding stage or None if every stage escalated)
+        """
+        for stage in self.stages:
+            decision = stage.decide(i, j)
+            with self._lock:
+                self._counts[stage.name][decision] += 1
+            if decision == ACCEPT:
+                return True, stage.name
+            if decision == REJECT:
+                return False, stage.name
+        with self._lock:
+            self._unresolved += 1
+        return False, None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-stage accept/reject/escalate counters and the unresolved count"""
+        with self._lock:
+            stats: Dict[str, Any] = {
+                name: {ACCEPT: c[ACCEPT], REJECT: c[REJECT], ESCALATE: c[ESCALATE]}
+                for name, c in self._counts.items()
+            }
+            stats['unresolved'] = self._unresolved
+        return stats
@@ -0,0 +1,253 @@
+"""
+Persistent near-duplicate index for streaming ingestion
+MinHash signatures live in an append-only file read through a memory map, and LSH
+band buckets in an indexed SQLite table, so new items are checked against everything
+seen so far without loading the corpus and the index survives process restarts
+"""
+import os
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, IO, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from .minhash import MinHasher, optimal_bands
+
+_SIGNATURE_DTYPE = np.dtype('<u4')
+
+
+def _lock_exclusive(path: str) -> IO[bytes]:
+    """
+    Open path and take a non-blocking exclusive lock on it, held until the file is closed
+
+    Raises:
+        RuntimeError: if another process holds the lock
+    """
+    handle = open(path, 'a+b')
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        raise RuntimeError(f"{path} is locked: the index is already open in another process")
+    return handle
+
+
+def _bucket_hash(values: Tuple[int, ...]) -> int:
+    data = b''.join(v.to_bytes(4, 'little') for v in values)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little', signed=True)
+
+
+class DedupIndex:
+    """
+    Disk-backed MinHash LSH index with incremental add() and query()
+
+    The directory holds signatures.bin (one fixed-size row of uint32 per item) and
+    index.sqlite (item ids, band buckets and the index settings). Settings are fixed
+    when the index is created; reopening uses the stored ones.
+
+    Rows in signatures.bin and index.sqlite are numbered together, so only one process
+    may have an index open at a time; opening takes an exclusive lock on the directory's
+    LOCK file and fails if another process holds it. Threads of one process can share an
+    instance.
+    """
+
+    def __init__(self, path: str, num_perm: int = 128, threshold: float = 0.5, bands: Optional[int] = None,
+                 content_field: str = 'content', title_field: str = 'title', id_field: str = 'id',
+                 sync_every: int = 100, mmap_size: int = 256 * 1024 * 1024):
+        """
+        Args:
+            path: Directory of the index, created if missing. Raises RuntimeError if the
+                index is already open in another process
+            num_perm: MinHash signature length (default: 128)
+            threshold: Estimated Jaccard similarity the LSH bands are tuned for and the
+                default minimum similarity reported by query() (default: 0.5)
+            bands: Explicit number of LSH bands, overriding the threshold-based choice
+            content_field: Field name containing content (default: 'content')
+            title_field: Field name containing title (default: 'title')
+            id_field: Field name containing unique identifier (default: 'id')
+            sync_every: Items added per commit (default: 100). flush() or close() commit the rest
+            mmap_size: Bytes of the SQLite file mapped into memory (default: 256 MiB)
+        """
+        os.makedirs(path, exist_ok=True)
+        self._lock_file = _lock_exclusive(os.path.join(path, 'LOCK'))
+        self.path = path
+        self.content_field = content_field
+        self.title_field = title_field
+        self.id_field = id_field
+        self.sync_every = sync_every
+        self._lock = threading.RLock()
+        self._pending = 0
+
+        self._conn = sqlite3.connect(os.path.join(path, 'index.sqlite'), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(f'PRAGMA mmap_size={int(mmap_size)}')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS items (row INTEGER PRIMARY KEY, item_id TEXT NOT NULL UNIQUE)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            'band INTEGER NOT NULL, bucket INTEGER NOT NULL, row INTEGER NOT NULL, '
+            'PRIMARY KEY (band, bucket, row)) WITHOUT ROWID'
+        )
+
+        meta = dict(self._conn.execute('SELECT key, value FROM meta'))
+        if meta:
+            num_perm, threshold = int(meta['num_perm']), float(meta['threshold'])
+            bands, rows = int(meta['bands']), int(meta['rows'])
+        else:
+            if bands is None:
+                bands, rows = optimal_bands(num_perm, threshold)
+            else:
+                if num_perm % bands:
+                    raise ValueError("bands must divide num_perm")
+                rows = num_perm // bands
+            self._conn.executemany('INSERT INTO meta (key, value) VALUES (?, ?)', [
+                ('num_perm', str(num_perm)), ('threshold', str(threshold)),
+                ('bands', str(bands)), ('rows', str(rows)),
+            ])
+        self._conn.commit()
+
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.hasher = MinHasher(num_perm=num_perm)
+
+        # Rows written to the signature file after the last commit belong to no item; drop them
+        self._count = self._conn.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+        self._row_bytes = num_perm * _SIGNATURE_DTYPE.itemsize
+        signature_path = os.path.join(path, 'signatures.bin')
+        self._file = open(signature_path, 'a+b')
+        self._file.truncate(self._count * self._row_bytes)
+        self._signature_path = signature_path
+        self._mapped: Optional[np.memmap] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _text(self, item: Dict[str, Any]) -> str:
+        return f"{item.get(self.title_field) or ''} {item.get(self.content_field) or ''}"
+
+    def _bucket_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, int]]:
+        return [
+            (band, _bucket_hash(signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    def _signatures(self) -> np.ndarray:
+        # Remap only when rows were appended since the last mapping
+        if self._mapped is None or len(self._mapped) < self._count:
+            self._file.flush()
+            self._mapped = np.memmap(self._signature_path, dtype=_SIGNATURE_DTYPE, mode='r',
+                                     shape=(self._count, self.num_perm)) if self._count else None
+        return self._mapped
+
+    def add(self, item: Dict[str, Any]) -> bool:
+        """
+        Index an item
+
+        Args:
+            item: Item with id, title and content fields
+
+        Returns:
+            True if the item was added, False if its id is already indexed
+        """
+        item_id = str(item.get(self.id_field))
+        signature = self.hasher.signature_for_text(self._text(item))
+        with self._lock:
+            if self._conn.execute('SELECT 1 FROM items WHERE item_id = ?', (item_id,)).fetchone():
+                return False
+            row = self._count
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(np.asarray(signature, dtype=_SIGNATURE_DTYPE).tobytes())
+            self._conn.execute('INSERT INTO items (row, item_id) VALUES (?, ?)', (row, item_id))
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO buckets (band, bucket, row) VALUES (?, ?, ?)',
+                [(band, bucket, row) for band, bucket in self._bucket_keys(signature)]
+            )
+            self._count += 1
+            self._pending += 1
+            if self._pending >= self.sync_every:
+                self._sync()
+        return True
+
+    def query(self, item: Dict[str, Any], threshold: Optional[float] = None,
+              limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Find indexed items similar to an item
+
+        Only items sharing an LSH bucket are scored, so cost depends on the number
+        of near neighbours rather than the size of the index.
+
+        Args:
+            item: Item with title and content fields; it does not need to be indexed
+            threshold: Minimum estimated Jaccard similarity (default: the index threshold)
+            limit: Maximum number of matches returned (default: all)
+
+        Returns:
+            List of (item id, estimated Jaccard similarity) sorted by decreasing similarity.
+            The queried item itself is excluded
+        """
+        threshold = self.threshold if threshold is None else threshold
+        item_id = str(item.get(self.id_field))
+        signature = np.asarray(self.hasher.signature_for_text(self._text(item)), dtype=_SIGNATURE_DTYPE)
+        with self._lock:
+            rows = set()
+            for band, bucket in self._bucket_keys(tuple(int(v) for v in signature)):
+                rows.update(r for (r,) in self._conn.execute(
+                    'SELECT row FROM buckets WHERE band = ? AND bucket = ?', (band, bucket)
+                ))
+            if not rows:
+                return []
+            rows = sorted(rows)
+            similarities = (self._signatures()[rows] == signature).mean(axis=1)
+            ids: Dict[int, str] = {}
+            for start in range(0, len(rows), 500):
+                chunk = rows[start:start + 500]
+                ids.update(self._conn.execute(
+                    f"SELECT row, item_id FROM items WHERE row IN ({','.join('?' * len(chunk))})", chunk
+                ))
+        matches = [
+            (ids[row], float(similarity)) for row, similarity in zip(rows, similarities)
+            if similarity >= threshold and ids[row] != item_id
+        ]
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches[:limit] if limit is not None else matches
+
+    def flush(self) -> None:
+        """Make every added item durable"""
+        with self._lock:
+            self._sync()
+
+    def _sync(self) -> None:
+        # Signatures reach disk before the rows that reference them are committed
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._conn.commit()
+        self._pending = 0
+
+    def close(self) -> None:
+        """Flush and release the index files"""
+        with self._lock:
+            self._sync()
+            self._mapped = None
+            self._file.close()
+            self._conn.close()
+            self._lock_file.close()
+
+    def __enter__(self) -> 'DedupIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,93 @@
+"""
+Options for duplicate detection
+Collects the candidate-generation, judging and blocking settings shared by
+find_duplicates, iter_duplicates and find_duplicate_clusters
+"""
+from dataclasses import dataclass, fields, replace
+from typing import Any, List, Optional
+
+from .blocking import Blocking
+from .dedup_cascade import DuplicateCascade
+
+
+@dataclass
+class DuplicateOptions:
+    """
+    Settings for finding duplicate items
+
+    Attributes:
+        content_field: Field name containing content (default: 'content')
+        title_field: Field name containing title (default: 'title')
+        id_field: Field name containing unique identifier (default: 'id')
+        candidate_threshold: If set, only pairs whose estimated Jaccard similarity of
+            title+content shingles is at least this value are judged. Lower values trade
+            more API calls for higher recall. If None, all pairs are compared
+        num_perm: MinHash signature length used for candidate generation (default: 128)
+        lsh_bands: Number of LSH bands. If None, chosen from candidate_threshold
+        embedding_top_k: If set, candidates are the top-k nearest neighbours of each item by
+            title+content embedding instead of all pairs (takes precedence over candidate_threshold)
+        embedding_accept_threshold: Cosine similarity at or above which a pair is reported as
+            duplicate without asking the model (default: 0.95)
+        embedding_escalate_threshold: Cosine similarity below which a pair is dropped; pairs
+            between the two thresholds are checked with the model (default: 0.80)
+        vector_index: 'exact' (NumPy brute force) or 'hnsw' (approximate, needs hnswlib)
+        cascade: Optional DuplicateCascade (see ContentProcessor.default_cascade) judging each
+            candidate pair with cheap local stages before the model. Its stats() hold
+            per-stage counters
+        date_field: If set, only items whose dates in this field are at most date_window_days
+            apart are paired. Items without a parseable date are paired within their block
+        date_window_days: Width of the date window in days (default: 3.0)
+        block_fields: Fields that must be equal for two items to be paired, e.g.
+            ['language', 'category']
+    """
+    content_field: str = 'content'
+    title_field: str = 'title'
+    id_field: str = 'id'
+    candidate_threshold: Optional[float] = None
+    num_perm: int = 128
+    lsh_bands: Optional[int] = None
+    embedding_top_k: Optional[int] = None
+    embedding_accept_threshold: float = 0.95
+    embedding_escalate_threshold: float = 0.80
+    vector_index: str = 'exact'
+    cascade: Optional[DuplicateCascade] = None
+    date_field: Optional[str] = None
+    date_window_days: float = 3.0
+    block_fields: Optional[List[str]] = None
+
+    @classmethod
+    def resolve(cls, options: Optional['DuplicateOptions'] = None,
+                content_field: Optional[str] = None,
+                title_field: Optional[str] = None,
+                id_field: Optional[str] = None,
+                **overrides: Any) -> 'DuplicateOptions':
+        """
+        Combine an options object with the arguments of a find_duplicates call
+
+        Args:
+            options: Base options. If None, the defaults are used
+            content_field: Content field name passed positionally; None keeps that of options
+            title_field: Title field name passed positionally; None keeps that of options
+            id_field: Id field name passed positionally; None keeps that of options
+            **overrides: Individual fields, e.g. candidate_threshold=0.3, replacing those of options
+
+        Returns:
+            New DuplicateOptions; options itself is left unchanged
+        """
+        if options is None:
+            options = cls()
+        elif not isinstance(options, cls):
+            raise TypeError(f"options must be a DuplicateOptions, got {type(options).__name__}")
+        unknown = set(overrides) - {field.name for field in fields(cls)}
+        if unknown:
+            raise TypeError(f"Unknown duplicate detection option(s): {', '.join(sorted(unknown))}")
+        named = {'content_field': content_field, 'title_field': title_field, 'id_field': id_field}
+        overrides.update({name: value for name, value in named.items() if value is not None})
+        return replace(options, **overrides) if overrides else options
+
+    def blocking(self) -> Optional[Blocking]:
+        """Build the blocking for these options, or None when no blocking is requested"""
+        if self.date_field is None and not self.block_fields:
+            return None
+        return Blocking(date_field=self.date_field, window_days=self.date_window_days,
+                        same_fields=self.block_fields or ())
@@ -0,0 +1,200 @@
+"""
+Local main-content extraction from HTML
+A small readability-style extractor built on the standard library html.parser,
+used to strip boilerplate before content is sent to the model
+"""
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+# Elements whose content is never article text
+SKIP_TAGS = frozenset({
+    'script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'form',
+    'button', 'select', 'textarea', 'nav', 'header', 'footer', 'aside', 'head', 'title',
+})
+
+# Elements that start a new block of text
+BLOCK_TAGS = frozenset({
+    'p', 'div', 'article', 'section', 'main', 'li', 'ul', 'ol', 'td', 'th', 'tr', 'table',
+    'blockquote', 'pre', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'dd', 'dt', 'figcaption', 'body',
+})
+
+HEADING_TAGS = frozenset({'h1', 'h2', 'h3', 'h4', 'h5', 'h6'})
+
+VOID_TAGS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr',
+})
+
+NEGATIVE_HINTS = re.compile(
+    r'comment|footer|sidebar|menu|navbar|breadcrumb|cookie|banner|advert|\bads?\b|promo|'
+    r'share|social|related|recommend|newsletter|subscribe|popup|modal|widget|sponsor',
+    re.IGNORECASE
+)
+POSITIVE_HINTS = re.compile(r'article|content|post|entry|story|body|main|text', re.IGNORECASE)
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class _Node:
+    __slots__ = ('tag', 'parent', 'weight', 'score')
+
+    def __init__(self, tag: str, parent: Optional['_Node'], weight: float):
+        self.tag = tag
+        self.parent = parent
+        self.weight = weight
+        self.score = 0.0
+
+
+class _Block:
+    __slots__ = ('text', 'link_chars', 'node', 'tag')
+
+    def __init__(self, text: str, link_chars: int, node: _Node, tag: str):
+        self.text = text
+        self.link_chars = link_chars
+        self.node = node
+        self.tag = tag
+
+    @property
+    def link_density(self) -> float:
+        return self.link_chars / len(self.text) if self.text else 1.0
+
+
+class _BlockParser(HTMLParser):
+    """Splits a document into text blocks, remembering the element each block belongs to"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node('#root', None, 0.0)
+        self.stack: List[_Node] = [self.root]
+        self.blocks: List[_Block] = []
+        self._skip_depth = 0
+        self._link_depth = 0
+        self._text: List[str] = []
+        self._link_chars = 0
+
+    def _flush(self) -> None:
+        text = _WHITESPACE.sub(' ', ''.join(self._text)).strip()
+        if text:
+            node = self.stack[-1]
+            self.blocks.append(_Block(text, self._link_chars, node, node.tag))
+        self._text = []
+        self._link_chars = 0
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in VOID_TAGS:
+            if tag == 'br':
+                self._text.append(' ')
+            return
+        attr_map: Dict[str, str] = {k: v or '' for k, v in attrs}
+        hints = f"{attr_map.get('class', '')} {attr_map.get('id', '')} {attr_map.get('role', '')}"
+        negative = bool(NEGATIVE_HINTS.search(hints)) and not re.search(r'article|main', hints, re.IGNORECASE)
+        if self._skip_depth or tag in SKIP_TAGS or (negative and tag not in ('body', 'html')):
+            self._skip_depth += 1
+            self.stack.append(_Node(tag, self.stack[-1], 0.0))
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+            # An unclosed <p> is implicitly closed by the next block element
+            if self.stack[-1].tag == 'p':
+                self.stack.pop()
+        weight = 25.0 if POSITIVE_HINTS.search(hints) else 0.0
+        if tag in ('article', 'main'):
+            weight += 25.0
+        self.stack.append(_Node(tag, self.stack[-1], weight))
+        if tag == 'a':
+            self._link_depth += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in VOID_TAGS:
+            return
+        # Pop up to the matching open element, ignoring stray end tags
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth].tag == tag:
+                break
+        else:
+            return
+        while len(self.stack) > depth:
+            node = self.stack[-1]
+            if self._skip_depth:
+                self._skip_depth -= 1
+            else:
+                if node.tag in BLOCK_TAGS:
+                    self._flush()
+                if node.tag == 'a' and self._link_depth:
+                    self._link_depth -= 1
+            self.stack.pop()
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth:
+            return
+        self._text.append(data)
+        if self._link_depth:
+            self._link_chars += len(data.strip())
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
+
+
+def extract_main_text(html_content: str, min_block_chars: int = 25, max_link_density: float = 0.5) -> str:
+    """
+    Reduce an HTML document to its main article text
+
+    Text blocks are scored by length, punctuation and link density; scores propagate to
+    the enclosing elements and the best-scoring container is taken as the article.
+
+    Args:
+        html_content: Raw HTML document
+        min_block_chars: Shortest paragraph counted towards a container's score (default: 25)
+        max_link_density: Highest share of link text a block may have to be kept (default: 0.5)
+
+    Returns:
+        Main text with blocks separated by blank lines, or an empty string if none was found
+    """
+    parser = _BlockParser()
+    try:
+        parser.feed(html_content)
+        parser.close()
+    except Exception:
+        # html.parser is lenient, but never let a malformed document break processing
+        pass
+
+    blocks = [b for b in parser.blocks if b.link_density <= max_link_density]
+    if not blocks:
+        return ''
+
+    candidates = []
+    for block in blocks:
+        if len(block.text) < min_block_chars:
+            continue
+        score = 1.0 + block.text.count(',') + min(len(block.text) / 100.0, 3.0)
+        score *= 1.0 - block.link_density
+        parent = block.node if block.tag in ('p', 'pre', 'blockquote', 'td') and block.node.parent else None
+        container = parent.parent if parent else block.node
+        for share, node in ((1.0, container), (0.5, container.parent if container else None)):
+            if node is None:
+                continue
+            if node.score == 0.0:
+                node.score = node.weight
+                candidates.append(node)
+            node.score += score * share
+
+    if not candidates:
+        return '\n\n'.join(b.text for b in blocks)
+
+    best = max(candidates, key=lambda n: n.score)
+
+    def inside(node: _Node) -> bool:
+        while node is not None:
+            if node is best:
+                return True
+            node = node.parent
+        return False
+
+    kept = [
+        b.text for b in blocks
+        if inside(b.node) and (len(b.text) >= min_block_chars or b.tag in HEADING_TAGS)
+    ]
+    return '\n\n'.join(kept)
+
@@ -0,0 +1,246 @@
+"""
+Call metrics for model requests
+Per-method latency, queue wait and token histograms, retry/error/cache counters and
+optional cost, with a Prometheus text exporter and pluggable callbacks
+"""
+import bisect
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 131072, 1048576)
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and interpolated quantiles"""
+
+    def __init__(self, buckets: Sequence[float]):
+        """
+        Args:
+            buckets: Increasing upper bounds; values above the last one fall into +Inf
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-quantile (0..1) by linear interpolation inside its bucket,
+        clamped to the observed minimum and maximum
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = max(self.buckets[index - 1] if index > 0 else 0.0, self.min)
+                upper = min(self.buckets[index] if index < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+        }
+
+
+class _MethodMetrics:
+    def __init__(self, latency_buckets: Sequence[float], token_buckets: Sequence[float]):
+        self.latency = Histogram(latency_buckets)
+        self.queue_wait = Histogram(latency_buckets)
+        self.prompt_tokens = Histogram(token_buckets)
+        self.response_tokens = Histogram(token_buckets)
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cost = 0.0
+
+
+def usage_tokens(response: Any) -> Dict[str, Optional[int]]:
+    """Read prompt and response token counts from a response's usage_metadata, if present"""
+    usage = getattr(response, 'usage_metadata', None)
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_token_count', None) if usage is not None else None,
+        'response_tokens': getattr(usage, 'candidates_token_count', None) if usage is not None else None,
+    }
+
+
+class MetricsRecorder:
+    """
+    Collects one event per model call and per cache lookup
+
+    Thread-safe; share one instance between services to aggregate them. Each event is
+    also passed to every callback as a dict, e.g. to forward it to a metrics backend.
+    """
+
+    def __init__(self,
+                 callbacks: Optional[List[Callable[[Dict[str, Any]], None]]] = None,
+                 input_price_per_million: Optional[float] = None,
+                 output_price_per_million: Optional[float] = None,
+                 latency_buckets: Sequence[float] = LATENCY_BUCKETS,
+                 token_buckets: Sequence[float] = TOKEN_BUCKETS):
+        """
+        Args:
+            callbacks: Functions called with every event dict. Exceptions are logged, not raised
+            input_price_per_million: Price per million prompt tokens, used to accumulate cost
+            output_price_per_million: Price per million response tokens
+            latency_buckets: Upper bounds in seconds for latency and queue wait histograms
+            token_buckets: Upper bounds for token count histograms
+        """
+        self.callbacks = list(callbacks or [])
+        self.input_price_per_million = input_price_per_million
+        self.output_price_per_million = output_price_per_million
+        self.latency_buckets = latency_buckets
+        self.token_buckets = token_buckets
+        self._methods: Dict[str, _MethodMetrics] = {}
+        self._lock = threading.Lock()
+
+    def add_callback(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Register a function called with every event dict"""
+        self.callbacks.append(callback)
+
+    def _method(self, method: str) -> _MethodMetrics:
+        metrics = self._methods.get(method)
+        if metrics is None:
+            metrics = self._methods[method] = _MethodMetrics(self.latency_buckets, self.token_buckets)
+        return metrics
+
+    def record_call(self, method: str, wall_seconds: float, queue_seconds: float, retries: int,
+                    response: Any = None, error: Optional[BaseException] = None) -> None:
+        """
+        Record a finished model call, retries included
+
+        Args:
+            method: Service method that issued the call
+            wall_seconds: Time from the first attempt to the final result or error
+            queue_seconds: Time spent waiting on the rate limiter
+            retries: Number of retried attempts
+            response: Final response, read for usage_metadata token counts
+            error: Exception that ended the call, if it failed
+        """
+        tokens = usage_tokens(response)
+        cost = None
+        if self.input_price_per_million is not None or self.output_price_per_million is not None:
+            cost = ((tokens['prompt_tokens'] or 0) * (self.input_price_per_million or 0.0)
+                    + (tokens['response_tokens'] or 0) * (self.output_price_per_million or 0.0)) / 1e6
+        event = {
+            'event': 'call',
+            'method': method,
+            'wall_seconds': wall_seconds,
+            'queue_seconds': queue_seconds,
+            'retries': retries,
+            'prompt_tokens': tokens['prompt_tokens'],
+            'response_tokens': tokens['response_tokens'],
+            'cost': cost,
+            'error': type(error).__name__ if error is not None else None,
+        }
+        with self._lock:
+            metrics = self._method(method)
+            metrics.calls += 1
+            metrics.retries += retries
+            metrics.latency.observe(wall_seconds)
+            metrics.queue_wait.observe(queue_seconds)
+            if error is not None:
+                metrics.errors += 1
+            if tokens['prompt_tokens'] is not None:
+                metrics.prompt_tokens.observe(tokens['prompt_tokens'])
+            if tokens['response_tokens'] is not None:
+                metrics.response_tokens.observe(tokens['response_tokens'])
+            if cost is not None:
+                metrics.cost += cost
+        self._emit(event)
+
+    def record_cache(self, method: str, hit: bool) -> None:
+        """Record a cache lookup for method"""
+        with self._lock:
+            metrics = self._method(method)
+            if hit:
+                metrics.cache_hits += 1
+            else:
+                metrics.cache_misses += 1
+        self._emit({'event': 'cache', 'method': method, 'hit': hit})
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        for callback in self.callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Metrics callback failed: {str(e)}")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-method counters and histogram summaries (count, sum, p50, p90, p99)"""
+        with self._lock:
+            return {
+                method: {
+                    'calls': m.calls,
+                    'errors': m.errors,
+                    'retries': m.retries,
+                    'cache_hits': m.cache_hits,
+                    'cache_misses': m.cache_misses,
+                    'cost': round(m.cost, 6),
+                    'latency_seconds': m.latency.summary(),
+                    'queue_wait_seconds': m.queue_wait.summary(),
+                    'prompt_tokens': m.prompt_tokens.summary(),
+                    'response_tokens': m.response_tokens.summary(),
+                }
+                for method, m in self._methods.items()
+            }
+
+    def prometheus_text(self, prefix: str = 'destiny_model') -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            methods = sorted(self._methods.items())
+            counters = (
+                ('calls_total', 'Model calls', lambda m: m.calls),
+                ('errors_total', 'Model calls that failed after all retries', lambda m: m.errors),
+                ('retries_total', 'Retried attempts', lambda m: m.retries),
+                ('cache_hits_total', 'Results served from the response cache', lambda m: m.cache_hits),
+                ('cache_misses_total', 'Cache lookups that needed a model call', lambda m: m.cache_misses),
+                ('cost_total', 'Accumulated cost of prompt and response tokens', lambda m: m.cost),
+            )
+            for name, help_text, value in counters:
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                for method, m in methods:
+                    lines.append(f'{prefix}_{name}{{method="{method}"}} {value(m)}')
+            histograms = (
+                ('call_seconds', 'Wall time of model calls including retries', lambda m: m.latency),
+                ('queue_wait_seconds', 'Time spent waiting on the rate limiter', lambda m: m.queue_wait),
+                ('prompt_tokens', 'Prompt tokens per call from usage metadata', lambda m: m.prompt_tokens),
+                ('response_tokens', 'Response tokens per call from usage metadata', lambda m: m.response_tokens),
+            )
+            for name, help_text, histogram_of in histograms:
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+                for method, m in methods:
+                    histogram = histogram_of(m)
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{prefix}_{name}_bucket{{method="{method}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{prefix}_{name}_bucket{{method="{method}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{prefix}_{name}_sum{{method="{method}"}} {histogram.sum}')
+                    lines.append(f'{prefix}_{name}_count{{method="{method}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
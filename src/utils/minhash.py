@@ -0,0 +1,157 @@
+"""
+MinHash signatures and locality-sensitive hashing for near-duplicate candidate generation
+Pure Python, deterministic across processes so signatures can be stored and compared later
+"""
+import re
+import random
+import hashlib
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Mersenne prime larger than any 32-bit shingle hash
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    """
+    Split text into a set of overlapping word n-grams
+
+    Args:
+        text: Text to shingle
+        size: Number of words per shingle (default: 3)
+
+    Returns:
+        Set of shingles. Texts shorter than size yield a single shingle with all their words
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _hash_shingle(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'big')
+
+
+class MinHasher:
+    """Computes fixed-length MinHash signatures approximating Jaccard similarity"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        """
+        Args:
+            num_perm: Number of hash permutations, i.e. signature length (default: 128)
+            seed: Seed for the permutation coefficients. Signatures are only comparable
+                when computed with the same num_perm and seed
+        """
+        self.num_perm = num_perm
+        self.seed = seed
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, shingle_set: Iterable[str]) -> Tuple[int, ...]:
+        """
+        Compute the MinHash signature of a set of shingles
+
+        Args:
+            shingle_set: Shingles of one document
+
+        Returns:
+            Tuple of num_perm minimum hash values. Empty input yields all-max values
+        """
+        hashes = [_hash_shingle(s) for s in shingle_set]
+        if not hashes:
+            return (_MAX_HASH,) * self.num_perm
+        return tuple(
+            min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+            for a, b in self._perms
+        )
+
+    def signature_for_text(self, text: str, shingle_size: int = 3) -> Tuple[int, ...]:
+        """Shingle text and return its signature"""
+        return self.signature(shingles(text, shingle_size))
+
+
+def estimate_jaccard(sig1: Tuple[int, ...], sig2: Tuple[int, ...]) -> float:
+    """Estimate Jaccard similarity as the fraction of matching signature positions"""
+    if not sig1:
+        return 0.0
+    return sum(1 for a, b in zip(sig1, sig2) if a == b) / len(sig1)
+
+
+def optimal_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Choose the (bands, rows) split of a signature whose LSH S-curve
+    crosses 50% candidate probability closest to threshold
+
+    Args:
+        num_perm: Signature length
+        threshold: Target Jaccard similarity
+
+    Returns:
+        Tuple of (bands, rows per band)
+    """
+    best = (num_perm, 1)
+    best_error = float('inf')
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class LSHIndex:
+    """Banded LSH index mapping signature bands to the keys that share them"""
+
+    def __init__(self, num_perm: int = 128, threshold: float = 0.5, bands: Optional[int] = None):
+        """
+        Args:
+            num_perm: Signature length of the indexed signatures
+            threshold: Jaccard similarity the band split is tuned for
+            bands: Explicit number of bands, overriding the threshold-based choice.
+                More bands raise recall at the cost of more candidates
+        """
+        if bands is None:
+            bands, rows = optimal_bands(num_perm, threshold)
+        else:
+            if num_perm % bands:
+                raise ValueError("bands must divide num_perm")
+            rows = num_perm // bands
+        self.bands = bands
+        self.rows = rows
+        self._buckets: List[Dict[Tuple[int, ...], List]] = [defaultdict(list) for _ in range(bands)]
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, signature[start:start + self.rows]
+
+    def add(self, key, signature: Tuple[int, ...]) -> None:
+        """Index a signature under key"""
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band][band_key].append(key)
+
+    def query(self, signature: Tuple[int, ...]) -> Set:
+        """Return keys sharing at least one band with signature"""
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(band_key, ()))
+        return candidates
+
+    def candidate_pairs(self) -> Set[Tuple]:
+        """Return every pair of keys that share at least one band bucket"""
+        pairs = set()
+        for buckets in self._buckets:
+            for keys in buckets.values():
+                if len(keys) < 2:
+                    continue
+                for i in range(len(keys)):
+                    for j in range(i + 1, len(keys)):
+                        a, b = keys[i], keys[j]
+                        pairs.add((a, b) if a < b else (b, a))
+        return pairs
@@ -0,0 +1,65 @@
+"""
+Compact tracking of compared item pairs
+Index-based pair enumeration never repeats an (i, j) pair, so tracking is only needed
+when several items share an id. Only pairs touching a repeated id are recorded, in a
+bitset with one row per repeated id instead of a set of id tuples
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class PairTracker:
+    """Remembers which id pairs were compared, for item lists where ids can repeat"""
+
+    def __init__(self, ids: Sequence[Any]):
+        """
+        Args:
+            ids: Item id per index, as passed to find_duplicates
+        """
+        canonical: Dict[Any, int] = {}
+        counts: List[int] = []
+        self._canonical: List[int] = []
+        for item_id in ids:
+            index = canonical.setdefault(item_id, len(canonical))
+            if index == len(counts):
+                counts.append(0)
+            counts[index] += 1
+            self._canonical.append(index)
+        self._distinct = len(canonical)
+        # Row per repeated id; pairs without a repeated id are unique by construction
+        self._rows: Dict[int, int] = {}
+        for index, count in enumerate(counts):
+            if count > 1:
+                self._rows[index] = len(self._rows)
+        self._bits = bytearray((len(self._rows) * self._distinct + 7) // 8)
+
+    @classmethod
+    def for_ids(cls, ids: Sequence[Any]) -> Optional['PairTracker']:
+        """Return a tracker for ids, or None if every id is unique and no tracking is needed"""
+        seen = set()
+        for item_id in ids:
+            if item_id in seen:
+                return cls(ids)
+            seen.add(item_id)
+        return None
+
+    def first_time(self, i: int, j: int) -> bool:
+        """
+        Mark the id pair of items i and j as compared
+
+        Returns:
+            True if this id pair was not compared before
+        """
+        a, b = self._canonical[i], self._canonical[j]
+        row_a, row_b = self._rows.get(a), self._rows.get(b)
+        if row_a is None and row_b is None:
+            return True
+        # Both orders of a pair must map to the same bit
+        if row_b is None or (row_a is not None and a <= b):
+            bit = row_a * self._distinct + b
+        else:
+            bit = row_b * self._distinct + a
+        byte, mask = bit >> 3, 1 << (bit & 7)
+        if self._bits[byte] & mask:
+            return False
+        self._bits[byte] |= mask
+        return True
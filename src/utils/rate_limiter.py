@@ -0,0 +1,176 @@
+"""
+Token-bucket rate limiting for AI API calls
+Limits requests per minute and tokens per minute, either within one process
+or across processes through a shared SQLite file
+"""
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+def _refill(level: float, updated: float, capacity: float, now: float) -> float:
+    """Return the bucket level after refilling at capacity per minute since updated"""
+    return min(capacity, level + (now - updated) * capacity / 60.0)
+
+
+class RateLimiter:
+    """
+    Base class for token-bucket rate limiters
+
+    Two buckets are kept: one for requests and one for model tokens. Each refills
+    continuously at its per-minute limit and holds at most one minute of quota.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        """
+        Args:
+            requests_per_minute: Maximum requests per minute. If None, requests are not limited
+            tokens_per_minute: Maximum tokens per minute. If None, tokens are not limited
+        """
+        if requests_per_minute is not None and requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        if tokens_per_minute is not None and tokens_per_minute <= 0:
+            raise ValueError("tokens_per_minute must be positive")
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+    def _limits(self, tokens: int) -> List[Tuple[str, float, float]]:
+        """Return (bucket name, capacity, amount requested) for each active bucket"""
+        limits = []
+        if self.requests_per_minute is not None:
+            limits.append(('requests', self.requests_per_minute, 1))
+        if self.tokens_per_minute is not None:
+            # A single call larger than the whole bucket waits for a full bucket instead of forever
+            limits.append(('tokens', self.tokens_per_minute, min(tokens, self.tokens_per_minute)))
+        return limits
+
+    @staticmethod
+    def _take(states: Dict[str, Tuple[float, float]],
+              limits: List[Tuple[str, float, float]],
+              now: float) -> Tuple[Dict[str, Tuple[float, float]], float]:
+        """
+        Try to take the requested amounts from every bucket at once
+
+        Args:
+            states: Current (level, updated) per bucket name. Missing buckets start full
+            limits: Output of _limits
+            now: Current time
+
+        Returns:
+            Tuple of (new states, seconds to wait). When the wait is positive nothing was taken
+        """
+        levels = {}
+        wait = 0.0
+        for name, capacity, amount in limits:
+            level, updated = states.get(name, (capacity, now))
+            level = _refill(level, updated, capacity, now)
+            levels[name] = level
+            if level < amount:
+                wait = max(wait, (amount - level) * 60.0 / capacity)
+        if wait > 0:
+            return {name: (levels[name], now) for name, _, _ in limits}, wait
+        return {name: (levels[name] - amount, now) for name, _, amount in limits}, 0.0
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """
+        Take one request and tokens from the buckets if available
+
+        Returns:
+            0.0 if acquired, otherwise the number of seconds to wait before retrying
+        """
+        raise NotImplementedError
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Block until one request and tokens can be taken from the buckets
+
+        Args:
+            tokens: Estimated number of tokens the call will consume
+
+        Returns:
+            Total seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def aacquire(self, tokens: int = 0) -> float:
+        """Async version of acquire that sleeps without blocking the event loop"""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+class TokenBucketLimiter(RateLimiter):
+    """In-process rate limiter, safe to share between threads and GeminiService instances"""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        super().__init__(requests_per_minute, tokens_per_minute)
+        self._states: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        with self._lock:
+            self._states, wait = self._take(self._states, self._limits(tokens), time.time())
+            return wait
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """
+    Rate limiter whose bucket state lives in a SQLite file, so every process
+    opening the same path draws from the same quota
+    """
+
+    def __init__(self, path: str, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, timeout: float = 30.0):
+        """
+        Args:
+            path: Path of the shared SQLite database file
+            requests_per_minute: Maximum requests per minute across all processes
+            tokens_per_minute: Maximum tokens per minute across all processes
+            timeout: Seconds to wait for the database lock held by another process
+        """
+        super().__init__(requests_per_minute, tokens_per_minute)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_buckets ('
+            'name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)'
+        )
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        limits = self._limits(tokens)
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front so read-modify-write is atomic across processes
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                states = {
+                    name: (level, updated)
+                    for name, level, updated in self._conn.execute('SELECT name, level, updated FROM rate_buckets')
+                }
+                new_states, wait = self._take(states, limits, time.time())
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO rate_buckets (name, level, updated) VALUES (?, ?, ?)',
+                    [(name, level, updated) for name, (level, updated) in new_states.items()]
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return wait
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
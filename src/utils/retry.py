@@ -0,0 +1,165 @@
+"""
+Retry policy with exponential backoff and jitter for transient AI API failures
+"""
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes worth retrying: rate limiting, timeouts and server-side failures
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+# google.api_core exception class names for the same conditions, matched by name so
+# classification works without importing the SDK
+RETRYABLE_ERROR_NAMES = frozenset({
+    'ResourceExhausted',
+    'TooManyRequests',
+    'ServiceUnavailable',
+    'InternalServerError',
+    'DeadlineExceeded',
+    'GatewayTimeout',
+    'BadGateway',
+    'RetryError',
+})
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(response, 'status', None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Extract a server-provided retry delay from an exception, if any
+
+    Looks at a retry_after attribute and at a Retry-After header on an attached response.
+
+    Returns:
+        Delay in seconds or None if the error carries no hint
+    """
+    value = getattr(error, 'retry_after', None)
+    if value is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+        if headers is not None:
+            try:
+                value = headers.get('Retry-After') or headers.get('retry-after')
+            except AttributeError:
+                value = None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Decides whether and when to retry a failed call"""
+
+    def __init__(self,
+                 max_attempts: int = 5,
+                 base_delay: float = 1.0,
+                 max_delay: float = 60.0,
+                 jitter: bool = True,
+                 retryable: Optional[Callable[[BaseException], bool]] = None,
+                 retryable_exceptions: Iterable[type] = (ConnectionError, TimeoutError)):
+        """
+        Args:
+            max_attempts: Total attempts including the first call (default: 5)
+            base_delay: Backoff delay in seconds before the first retry (default: 1.0)
+            max_delay: Upper bound of a single backoff delay in seconds (default: 60.0)
+            jitter: Use "full jitter", i.e. a random delay between 0 and the backoff (default: True)
+            retryable: Custom classifier returning True for errors worth retrying.
+                If None, is_retryable's built-in classification is used
+            retryable_exceptions: Exception types always treated as transient
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retryable = retryable
+        self.retryable_exceptions = tuple(retryable_exceptions)
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Return True if error looks transient"""
+        if self.retryable is not None:
+            return self.retryable(error)
+        if isinstance(error, self.retryable_exceptions):
+            return True
+        if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+            return True
+        return _status_code(error) in RETRYABLE_STATUS_CODES
+
+    def delay(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """
+        Compute the delay before the next attempt
+
+        Args:
+            attempt: Number of attempts made so far (1 after the first failure)
+            error: The error that triggered the retry, checked for a Retry-After hint
+
+        Returns:
+            Seconds to sleep
+        """
+        backoff = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        if self.jitter:
+            backoff = random.uniform(0, backoff)
+        hint = retry_after_seconds(error) if error is not None else None
+        if hint is not None:
+            # The server knows best, but never wait less than the hint
+            return max(hint, backoff)
+        return backoff
+
+    def call(self, func: Callable[[], Any], on_retry: Optional[Callable[[int, BaseException], None]] = None) -> Any:
+        """
+        Call func, retrying transient failures
+
+        Args:
+            func: Zero-argument callable to invoke
+            on_retry: Optional function called with (attempt, error) before each retry
+
+        Returns:
+            The result of the first successful call
+
+        Raises:
+            The last error when it is not retryable or attempts are exhausted
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return func()
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.is_retryable(e):
+                    raise
+                wait = self.delay(attempt, e)
+                logger.warning(f"Transient error (attempt {attempt}/{self.max_attempts}), retrying in {wait:.2f}s: {str(e)}")
+                if on_retry:
+                    on_retry(attempt, e)
+                time.sleep(wait)
+
+    async def acall(self, func: Callable[[], Awaitable[Any]],
+                    on_retry: Optional[Callable[[int, BaseException], None]] = None) -> Any:
+        """Async version of call for a zero-argument coroutine function"""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await func()
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.is_retryable(e):
+                    raise
+                wait = self.delay(attempt, e)
+                logger.warning(f"Transient error (attempt {attempt}/{self.max_attempts}), retrying in {wait:.2f}s: {str(e)}")
+                if on_retry:
+                    on_retry(attempt, e)
+                await asyncio.sleep(wait)
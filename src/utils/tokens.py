@@ -0,0 +1,190 @@
+"""
+Token budgeting helpers
+Token counting with a local estimator, token-aware truncation and chunking of long text
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+# Context window sizes (input tokens) of known models; unknown models use DEFAULT_CONTEXT_TOKENS
+MODEL_CONTEXT_TOKENS = {
+    'gemini-1.0-pro': 30720,
+    'gemini-1.5-flash': 1048576,
+    'gemini-1.5-flash-8b': 1048576,
+    'gemini-1.5-pro': 2097152,
+    'gemini-2.0-flash': 1048576,
+}
+DEFAULT_CONTEXT_TOKENS = 30720
+
+# Maximum response sizes (output tokens) of known models; unknown models use DEFAULT_OUTPUT_TOKENS
+MODEL_OUTPUT_TOKENS = {
+    'gemini-1.0-pro': 2048,
+    'gemini-1.5-flash': 8192,
+    'gemini-1.5-flash-8b': 8192,
+    'gemini-1.5-pro': 8192,
+    'gemini-2.0-flash': 8192,
+}
+DEFAULT_OUTPUT_TOKENS = 2048
+
+# Scripts where a single character is roughly one token (CJK ideographs, kana, hangul)
+_WIDE_CHARS = re.compile(
+    '[\u1100-\u11ff\u2e80-\u2fdf\u3040-\u30ff\u3100-\u31ff\u3400-\u4dbf'
+    '\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]'
+)
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SENTENCE_END = re.compile(r'(?<=[.!?。！？])\s*')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of text without calling the model
+
+    Latin-script text averages about 4 characters per token; CJK characters
+    are counted as one token each.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated number of tokens (at least 1 for non-empty text)
+    """
+    if not text:
+        return 0
+    wide = len(_WIDE_CHARS.findall(text))
+    return wide + (len(text) - wide + 3) // 4
+
+
+def _model_limit(limits: dict, model_name: str, default: int) -> int:
+    # Longest matching prefix wins, so e.g. gemini-1.5-flash-8b is not taken for gemini-1.5-flash
+    name = model_name.split('/')[-1]
+    for known in sorted(limits, key=len, reverse=True):
+        if name.startswith(known):
+            return limits[known]
+    return default
+
+
+def context_window(model_name: str) -> int:
+    """Return the input token limit of a model, matching on the longest known name prefix"""
+    return _model_limit(MODEL_CONTEXT_TOKENS, model_name, DEFAULT_CONTEXT_TOKENS)
+
+
+def max_output_tokens(model_name: str) -> int:
+    """Return the output token limit of a model, matching on the longest known name prefix"""
+    return _model_limit(MODEL_OUTPUT_TOKENS, model_name, DEFAULT_OUTPUT_TOKENS)
+
+
+class TokenCounter:
+    """
+    Counts tokens with an optional model-backed counter, falling back to the
+    local estimate when the counter is missing or fails. Results are memoized.
+    """
+
+    def __init__(self, count_func: Optional[Callable[[str], int]] = None, cache_size: int = 4096):
+        """
+        Args:
+            count_func: Exact counting function (e.g. wrapping model.count_tokens).
+                If None, only the local estimate is used
+            cache_size: Number of counts kept in the LRU memo (default: 4096)
+        """
+        self.count_func = count_func
+        self.cache_size = cache_size
+        self._memo: "OrderedDict[tuple, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        """Return the token count of text"""
+        if self.count_func is None:
+            return estimate_tokens(text)
+        key = (len(text), hash(text))
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        try:
+            tokens = int(self.count_func(text))
+        except Exception:
+            tokens = estimate_tokens(text)
+        with self._lock:
+            self._memo[key] = tokens
+            if len(self._memo) > self.cache_size:
+                self._memo.popitem(last=False)
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cut text to at most max_tokens, preferring to end on whitespace
+
+        Args:
+            text: Text to truncate
+            max_tokens: Token budget
+
+        Returns:
+            Text unchanged if it fits, otherwise its longest prefix found within budget
+        """
+        if max_tokens <= 0:
+            return ''
+        total = self.count(text)
+        if total <= max_tokens:
+            return text
+        # Shrink proportionally to the measured chars-per-token ratio until the prefix fits
+        cut = len(text)
+        for _ in range(8):
+            cut = int(cut * max_tokens / max(total, 1) * 0.98)
+            if cut <= 0:
+                return ''
+            space = text.rfind(' ', int(cut * 0.9), cut)
+            prefix = text[:space if space > 0 else cut]
+            total = self.count(prefix)
+            if total <= max_tokens:
+                return prefix
+            cut = len(prefix)
+        return prefix[:max_tokens]
+
+    def chunk(self, text: str, max_tokens: int) -> List[str]:
+        """
+        Split text into chunks of at most max_tokens along paragraph and sentence boundaries
+
+        Args:
+            text: Text to split
+            max_tokens: Token budget per chunk
+
+        Returns:
+            List of chunks in document order
+        """
+        # Pieces are (separator before the piece, text): paragraphs are rejoined with a blank
+        # line, sentences and cut-off sentence parts of one paragraph with a space
+        pieces: List[Tuple[str, str]] = []
+        for paragraph in _PARAGRAPH_BREAK.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if self.count(paragraph) <= max_tokens:
+                pieces.append(('\n\n', paragraph))
+                continue
+            separator = '\n\n'
+            for sentence in _SENTENCE_END.split(paragraph):
+                while sentence:
+                    head = self.truncate(sentence, max_tokens)
+                    if not head:
+                        head = sentence[:max(1, max_tokens)]
+                    pieces.append((separator, head))
+                    separator = ' '
+                    sentence = sentence[len(head):].strip()
+
+        chunks: List[str] = []
+        current = ''
+        for separator, piece in pieces:
+            if not current:
+                current = piece
+                continue
+            # Measure the joined text, so separators are charged what they actually cost
+            candidate = current + separator + piece
+            if self.count(candidate) <= max_tokens:
+                current = candidate
+            else:
+                chunks.append(current)
+                current = piece
+        if current:
+            chunks.append(current)
+        return chunks
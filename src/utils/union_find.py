@@ -0,0 +1,62 @@
+"""
+Union-find (disjoint set) structure for grouping duplicate items into clusters
+"""
+from typing import Dict, List
+
+
+class UnionFind:
+    """Disjoint sets over the integers 0..n-1 with path halving and union by size"""
+
+    def __init__(self, n: int = 0):
+        """
+        Args:
+            n: Number of initial singleton elements (default: 0)
+        """
+        self._parent: List[int] = list(range(n))
+        self._size: List[int] = [1] * n
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def add(self) -> int:
+        """Add a new singleton element and return its index"""
+        self._parent.append(len(self._parent))
+        self._size.append(1)
+        return len(self._parent) - 1
+
+    def find(self, x: int) -> int:
+        """Return the representative of the set containing x"""
+        parent = self._parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> bool:
+        """
+        Merge the sets containing a and b
+
+        Returns:
+            True if the sets were merged, False if a and b were already connected
+        """
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._size[root_a] += self._size[root_b]
+        return True
+
+    def connected(self, a: int, b: int) -> bool:
+        """Return True if a and b are in the same set"""
+        return self.find(a) == self.find(b)
+
+    def labels(self) -> List[int]:
+        """
+        Return a compact cluster id per element
+
+        Ids are numbered 0..k-1 in order of each cluster's first element.
+        """
+        compact: Dict[int, int] = {}
+        return [compact.setdefault(self.find(x), len(compact)) for x in range(len(self._parent))]
@@ -0,0 +1,140 @@
+"""
+Vector indexes for nearest-neighbour search over embeddings
+Exact brute-force search with NumPy, or approximate HNSW search when hnswlib is installed
+"""
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+
+
+def normalize(vectors: Any) -> np.ndarray:
+    """Return vectors as a float32 matrix with unit-length rows (zero rows stay zero)"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorIndex:
+    """Exact cosine-similarity index using normalized dot products"""
+
+    def __init__(self, dimension: int):
+        """
+        Args:
+            dimension: Length of the indexed vectors
+        """
+        self.dimension = dimension
+        self._keys: List[Any] = []
+        self._blocks: List[np.ndarray] = []
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, keys: Sequence[Any], vectors: Any) -> None:
+        """Index vectors under the given keys"""
+        if len(keys) == 0:
+            return
+        matrix = normalize(vectors)
+        if matrix.shape != (len(keys), self.dimension):
+            raise ValueError(f"Expected {len(keys)} vectors of dimension {self.dimension}, got {matrix.shape}")
+        self._keys.extend(keys)
+        self._blocks.append(matrix)
+
+    def _all(self) -> np.ndarray:
+        # Consolidate appended blocks lazily so repeated adds stay cheap
+        if self._blocks:
+            self._matrix = np.vstack([self._matrix] + self._blocks)
+            self._blocks = []
+        return self._matrix
+
+    def search(self, vectors: Any, k: int = 10, batch_size: int = 1024) -> List[List[Tuple[Any, float]]]:
+        """
+        Find the k most similar indexed vectors for each query vector
+
+        Args:
+            vectors: Query vectors
+            k: Neighbours returned per query (default: 10)
+            batch_size: Queries scored per matrix product, bounding memory use (default: 1024)
+
+        Returns:
+            For each query, a list of (key, cosine similarity) sorted by decreasing similarity
+        """
+        matrix = self._all()
+        queries = normalize(vectors)
+        k = min(k, len(self._keys))
+        results: List[List[Tuple[Any, float]]] = []
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+        for start in range(0, len(queries), batch_size):
+            scores = queries[start:start + batch_size] @ matrix.T
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for row, candidates in enumerate(top):
+                ordered = candidates[np.argsort(-scores[row, candidates])]
+                results.append([(self._keys[i], float(scores[row, i])) for i in ordered])
+        return results
+
+
+class HNSWVectorIndex:
+    """
+    Approximate cosine-similarity index backed by hnswlib
+
+    Same interface as VectorIndex; requires the optional hnswlib package.
+    """
+
+    def __init__(self, dimension: int, max_elements: int = 100000, ef_construction: int = 200,
+                 m: int = 16, ef_search: int = 64):
+        """
+        Args:
+            dimension: Length of the indexed vectors
+            max_elements: Initial capacity; grown automatically as vectors are added
+            ef_construction: Build-time accuracy/speed trade-off (default: 200)
+            m: Graph connectivity (default: 16)
+            ef_search: Query-time accuracy/speed trade-off (default: 64)
+        """
+        try:
+            import hnswlib
+        except ImportError:
+            raise ImportError("hnswlib is required for HNSWVectorIndex. Install it with: pip install hnswlib")
+
+        self.dimension = dimension
+        self.ef_search = ef_search
+        self._keys: List[Any] = []
+        self._index = hnswlib.Index(space='cosine', dim=dimension)
+        self._index.init_index(max_elements=max_elements, ef_construction=ef_construction, M=m)
+        self._index.set_ef(ef_search)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, keys: Sequence[Any], vectors: Any) -> None:
+        """Index vectors under the given keys"""
+        if len(keys) == 0:
+            return
+        matrix = normalize(vectors)
+        needed = len(self._keys) + len(keys)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 * self._index.get_max_elements()))
+        labels = np.arange(len(self._keys), needed)
+        self._index.add_items(matrix, labels)
+        self._keys.extend(keys)
+
+    def search(self, vectors: Any, k: int = 10) -> List[List[Tuple[Any, float]]]:
+        """
+        Find approximately the k most similar indexed vectors for each query vector
+
+        Returns:
+            For each query, a list of (key, cosine similarity) sorted by decreasing similarity
+        """
+        k = min(k, len(self._keys))
+        queries = normalize(vectors)
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+        self._index.set_ef(max(self.ef_search, k))
+        labels, distances = self._index.knn_query(queries, k=k)
+        return [
+            [(self._keys[label], 1.0 - float(distance)) for label, distance in zip(row_labels, row_distances)]
+            for row_labels, row_distances in zip(labels, distances)
+        ]